@@ -0,0 +1,426 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+import numpy as np
+
+from game import (CHANNELS, ROAD_Y, SCREEN_HEIGHT, SCREEN_WIDTH, Bullet, Coin, DinoRunner, DisappearingPlatform,
+                  Enemy, Game, LevelTemplate, MovingPlatform, ObstacleCar, Platform, PlayerBatch,
+                  PowerUp, ScriptedInput, SpatialHash, SpawnSchedule, Terrain)
+
+
+def build_level(count, width, seed=1):
+    """Random custom-level sized entity sets spread across `width` pixels"""
+    rng = random.Random(seed)
+    platforms = [Platform(rng.randint(0, width), rng.randint(100, SCREEN_HEIGHT - 100),
+                          rng.randint(60, 200), 20) for _ in range(count)]
+    enemies = []
+    for _ in range(count):
+        left = rng.randint(0, width)
+        enemies.append(Enemy(left + 10, rng.randint(100, SCREEN_HEIGHT - 130), left, left + 150))
+    coins = [Coin(rng.randint(0, width), rng.randint(50, SCREEN_HEIGHT - 120)) for _ in range(count)]
+    powerups = [PowerUp(rng.randint(0, width), rng.randint(50, SCREEN_HEIGHT - 120),
+                        rng.choice(['speed', 'jump', 'invulnerable', 'reverse'])) for _ in range(count)]
+    return platforms, enemies, coins, powerups
+
+
+def probe_path(frames, width):
+    """Player-sized rect sweeping the level, as the player would"""
+    return [pygame.Rect(int(i * width / frames), SCREEN_HEIGHT - 300 + (i % 120), 40, 50)
+            for i in range(frames)]
+
+
+def bench_platformer(count, frames=600, width=SCREEN_WIDTH * 20):
+    platforms, enemies, coins, powerups = build_level(count, width)
+    probes = probe_path(frames, width)
+    groups = [platforms, enemies, coins + powerups]
+
+    start = time.perf_counter()
+    linear_hits = 0
+    for rect in probes:
+        for group in groups:
+            for entity in group:
+                if rect.colliderect(entity.rect):
+                    linear_hits += 1
+    linear = time.perf_counter() - start
+
+    grids = [SpatialHash(128, group) for group in groups]
+    start = time.perf_counter()
+    grid_hits = 0
+    for rect in probes:
+        for grid in grids:
+            grid_hits += len(grid.colliding(rect))
+    hashed = time.perf_counter() - start
+
+    assert linear_hits == grid_hits, (linear_hits, grid_hits)
+    return linear, hashed
+
+
+def bench_bullets(count, frames=100, seed=2):
+    rng = random.Random(seed)
+    road_y = SCREEN_HEIGHT - 180
+    obstacles = [ObstacleCar(rng.randint(0, SCREEN_WIDTH * 30), road_y, 4) for _ in range(count)]
+    bullets = [Bullet(rng.randint(0, SCREEN_WIDTH * 30), road_y + 10) for _ in range(count)]
+
+    start = time.perf_counter()
+    linear_hits = 0
+    for _ in range(frames):
+        for b in bullets:
+            for obs in obstacles:
+                if b.rect.colliderect(obs.rect):
+                    linear_hits += 1
+                    break
+    linear = time.perf_counter() - start
+
+    grid = SpatialHash(256, obstacles)
+    start = time.perf_counter()
+    grid_hits = 0
+    for _ in range(frames):
+        for b in bullets:
+            if grid.colliding(b.rect):
+                grid_hits += 1
+    hashed = time.perf_counter() - start
+
+    assert linear_hits == grid_hits, (linear_hits, grid_hits)
+    return linear, hashed
+
+
+def broadphase_report(counts=(10, 20, 40, 60, 100, 300, 1000)):
+    print(f"{'scenario':<24}{'entities':>9}{'linear ms':>12}{'grid ms':>10}{'speedup':>9}")
+    for name, bench in (('platformer sweep', bench_platformer), ('bullets x obstacles', bench_bullets)):
+        for count in counts:
+            linear, hashed = bench(count)
+            print(f"{name:<24}{count:>9}{linear * 1000:>12.1f}{hashed * 1000:>10.1f}"
+                  f"{linear / max(hashed, 1e-9):>8.1f}x")
+
+
+def player_batch_rate(n=8192, steps=600, width=SCREEN_WIDTH * 3, seed=9):
+    """Player-steps/sec for a PlayerBatch of n players over static, hidden and zero-size platforms"""
+    rng = np.random.default_rng(seed)
+    platforms = build_level(24, width, seed)[0]
+    for i in range(6):
+        platform = DisappearingPlatform(i * width // 6, SCREEN_HEIGHT - 220 - 60 * (i % 3), 120, 20)
+        platform.visible = i % 2 == 0
+        platforms.append(platform)
+    platforms.append(Platform(width // 2, SCREEN_HEIGHT - 300, 0, 20))
+    batch = PlayerBatch(n, rng.integers(0, width, n), rng.integers(0, SCREEN_HEIGHT - 150, n), platforms, width)
+    # Held keys change every 8 steps, like an agent with frame_skip.
+    keys = rng.random((steps // 8 + 1, 3, n)) < np.array([0.3, 0.6, 0.25])[:, None]
+    start = time.perf_counter()
+    for step in range(steps):
+        left, right, jump = keys[step // 8]
+        batch.step(left, right, jump)
+    return n * steps / (time.perf_counter() - start)
+
+
+def player_batch_report():
+    """PlayerBatch throughput (its equivalence with Player is tests/test_player_batch.py)"""
+    return {'player_steps_per_sec': {n: round(player_batch_rate(n)) for n in (256, 4096, 16384)}}
+
+
+def generate_level(screens, seed=1):
+    """A `screens`-wide platformer level in the levels/*.json layout, as a LevelTemplate"""
+    rng = random.Random(seed)
+    data = {'name': f'generated-{screens}', 'player': [50, SCREEN_HEIGHT - 200],
+            'platforms': [], 'enemies': [], 'coins': [], 'powerups': [],
+            'red_coin': [screens * SCREEN_WIDTH - 120, SCREEN_HEIGHT - 175]}
+    for screen in range(screens):
+        ox = screen * SCREEN_WIDTH
+        data['platforms'].append({'type': 'platform', 'rect': [ox, SCREEN_HEIGHT - 100, SCREEN_WIDTH, 100]})
+        for i in range(4):
+            x = ox + 100 + i * 220 + rng.randint(-40, 40)
+            y = SCREEN_HEIGHT - 200 - rng.randint(0, 3) * 100
+            kind = rng.choice(('platform', 'disappearing', 'bounce', 'moving'))
+            spec = {'type': kind, 'rect': [x, y, 150, 20]}
+            if kind == 'moving':
+                spec.update(range=[x - 50, x + 100], speed=rng.choice((1, 2)))
+            data['platforms'].append(spec)
+            data['enemies'].append({'pos': [x + 10, y - 30], 'patrol': [x, x + 150]})
+            data['coins'].append([x + 60, y - 60])
+        data['powerups'].append({'pos': [ox + rng.randint(100, 900), SCREEN_HEIGHT - 140],
+                                 'type': rng.choice(LevelTemplate.POWERUP_TYPES)})
+    return LevelTemplate.parse(data, data['name'])
+
+
+def scenario_game(seed, **kwargs):
+    game = Game(headless=True, render_every=0, highscore_path=None, seed=seed, **kwargs)
+    game.red_coin = None
+    return game
+
+
+def platformer_scenario(count, seed=3, entity_storage='objects'):
+    """`count` each of Enemy, Coin and MovingPlatform on one screen; the player can't die"""
+    game = scenario_game(seed, entity_storage=entity_storage)
+    rng = random.Random(seed)
+    for _ in range(count):
+        left = rng.randint(0, SCREEN_WIDTH - 200)
+        y = rng.randint(100, SCREEN_HEIGHT - 150)
+        game.platforms.append(MovingPlatform(left + 10, y, rng.randint(60, 150), 20,
+                                             left, left + 200, rng.choice((1, 2, 3))))
+        left = rng.randint(0, SCREEN_WIDTH - 150)
+        game.enemies.append(Enemy(left + 10, rng.randint(100, SCREEN_HEIGHT - 130), left, left + 150))
+        game.coins.append(Coin(rng.randint(0, SCREEN_WIDTH - 20), rng.randint(50, SCREEN_HEIGHT - 120)))
+    game.build_broadphase()
+
+    def tick():
+        game.player.invulnerable_timer = 2
+        game.sim_step()
+
+    return tick, game.draw
+
+
+def platformer_arrays_scenario(count, seed=3):
+    """platformer_scenario with the entities in NumPy columns (entity_storage='arrays')"""
+    return platformer_scenario(count, seed, entity_storage='arrays')
+
+
+def stream_scenario(screens, seed=7):
+    """Player running right through a `screens`-wide generated level; only nearby chunks are awake"""
+    held = ScriptedInput()
+    held.press(pygame.K_RIGHT)
+    game = scenario_game(seed, input_source=held, level=generate_level(screens, seed))
+
+    def tick():
+        game.player.invulnerable_timer = 2
+        game.sim_step()
+
+    return tick, game.draw
+
+
+def hill_climb_scenario(count, seed=4):
+    """`count` ObstacleCars (pool capacity 256) on flat terrain, a bullet per tick along the ground and their explosions"""
+    game = scenario_game(seed)
+    game.game_mode = 'hill_climb'
+    # Flat ground keeps the bullets in the obstacles' lane; obstacles still
+    # sample the heightfield every tick.
+    game.terrain = Terrain(seed, roughness=0)
+    rng = random.Random(seed)
+    lane_y = ROAD_Y - 20
+
+    def tick():
+        car_x = game.car.x
+        obstacles = game.obstacles
+        # Cull obstacles before they reach the parked car so the run never ends in a crash.
+        for i in range(len(obstacles) - 1, -1, -1):
+            obs = obstacles[i]
+            if obs.x < car_x + 150:
+                game.obstacle_grid.remove(obs)
+                obstacles.release(obs)
+        while len(obstacles) < count:
+            obs = obstacles.spawn(car_x + rng.randint(200, SCREEN_WIDTH * 3), lane_y, 4 + rng.random() * 2)
+            if obs is None:
+                break
+            game.obstacle_grid.insert(obs)
+        game.bullets.spawn(car_x + game.car.width, lane_y)
+        game.sim_step()
+    return tick, game.draw
+
+
+def dino_scenario(count, seed=5, speed=20):
+    """DinoRunner at high speed with `count` cactuses on screen; crashes don't end the run"""
+    game = scenario_game(seed)
+    frames = SCREEN_WIDTH / count / speed
+    schedule = SpawnSchedule(seed, speed=speed, ramp=0, gap_frames=(frames, frames))
+    runner = DinoRunner(game, schedule, capacity=count * 2)
+
+    def tick():
+        runner.step(())
+
+    def draw():
+        runner.draw(game.screen)
+        pygame.display.flip()
+
+    return tick, draw
+
+
+SCENARIOS = {
+    'platformer_50': (platformer_scenario, 50),
+    'platformer_300': (platformer_scenario, 300),
+    'platformer_arrays_300': (platformer_arrays_scenario, 300),
+    'platformer_stream_5': (stream_scenario, 5),
+    'platformer_stream_100': (stream_scenario, 100),
+    'hill_climb_100': (hill_climb_scenario, 100),
+    'hill_climb_250': (hill_climb_scenario, 250),
+    'dino_20': (dino_scenario, 20),
+    'dino_100': (dino_scenario, 100),
+}
+
+
+def restart_latency(restarts=2000, inits=20):
+    """Mean microseconds for Game.restart() against constructing a whole new Game"""
+    game = scenario_game(6)
+    start = time.perf_counter()
+    for seed in range(restarts):
+        game.restart(seed)
+    restart_us = (time.perf_counter() - start) / restarts * 1e6
+    start = time.perf_counter()
+    for seed in range(inits):
+        scenario_game(seed)
+    init_us = (time.perf_counter() - start) / inits * 1e6
+    return {'restart_us': round(restart_us, 1), 'game_init_us': round(init_us, 1)}
+
+
+def scene_latency(rounds=100):
+    """Scene switch to first presented frame (mean ms per switch), and what the old
+    pygame.init()/mixer.init()/set_mode() after every dino round cost on this display"""
+    game = scenario_game(7)
+    for _ in range(rounds):
+        for switch in (lambda: setattr(game, 'game_mode', 'hill_climb'), lambda: game.scenes.push(game.dino_scene),
+                       game.scenes.pop, lambda: setattr(game, 'game_mode', 'platformer')):
+            switch()
+            game.draw()
+    stats = game.scenes.stats()
+    start = time.perf_counter()
+    for _ in range(5):
+        pygame.init()
+        pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+        pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    reinit_ms = (time.perf_counter() - start) / 5 * 1000
+    result = {name: s['mean_ms'] for name, s in stats.items()}
+    result['legacy_reinit_ms'] = round(reinit_ms, 3)
+    return result
+
+
+STARTUP_PROBE = """
+import json, sys
+import game
+g = game.Game(headless=True, render_every=1, highscore_path=sys.argv[1], seed=0)
+g.step()
+game.play_sound(game.JUMP_SOUND)
+print(json.dumps(game.STARTUP.report()))
+"""
+
+
+def startup_time(runs=3):
+    """Cold start to first frame in a fresh interpreter (best of `runs`), with its per-phase split"""
+    best = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, '-c', STARTUP_PROBE, os.path.join(tmp, 'highscore.txt')],
+                                 capture_output=True, text=True, check=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+            report = json.loads(out.strip().splitlines()[-1])
+            if best is None or report['first_frame_ms'] < best['first_frame_ms']:
+                best = report
+    return best
+
+
+def measure(build, count, ticks, frames, repeat):
+    """Best-of-`repeat` ticks/sec (simulation only) and frames/sec (simulation + render)"""
+    best_tps = best_fps = 0.0
+    for _ in range(repeat):
+        tick, draw = build(count)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            tick()
+        best_tps = max(best_tps, ticks / (time.perf_counter() - start))
+
+        tick, draw = build(count)
+        start = time.perf_counter()
+        for _ in range(frames):
+            tick()
+            draw()
+        best_fps = max(best_fps, frames / (time.perf_counter() - start))
+    return {'entities': count, 'ticks_per_sec': round(best_tps, 1), 'frames_per_sec': round(best_fps, 1)}
+
+
+def run_scenarios(names, ticks=2000, frames=300, repeat=3):
+    results = {}
+    for name in names:
+        build, count = SCENARIOS[name]
+        results[name] = measure(build, count, ticks, frames, repeat)
+        r = results[name]
+        print(f"{name:<22}{r['entities']:>6}{r['ticks_per_sec']:>14.0f} ticks/s{r['frames_per_sec']:>10.0f} frames/s",
+              file=sys.stderr)
+    restart = restart_latency()
+    print(f"{'restart':<18}{restart['restart_us']:>20.1f} us (new Game: {restart['game_init_us']:.0f} us)",
+          file=sys.stderr)
+    scenes = scene_latency()
+    for name, ms in scenes.items():
+        print(f"{name:<26}{ms:>12.3f} ms", file=sys.stderr)
+    startup = startup_time()
+    print(f"{'startup':<18}{startup['first_frame_ms']:>20.1f} ms to first frame", file=sys.stderr)
+    players = player_batch_report()
+    for n, rate in players['player_steps_per_sec'].items():
+        print(f"{'player batch':<18}{n:>6}{rate:>14.0f} player-steps/s", file=sys.stderr)
+    return {
+        'restart': restart,
+        'scene_switch_ms': scenes,
+        'startup': startup,
+        # PlayerBatch player-steps/sec by batch size.
+        'players': players,
+        # Voices played, stolen and dropped over every scenario above (hill-climb fire is the load).
+        'mixer': CHANNELS.stats(),
+        'meta': {'python': platform.python_version(), 'pygame': pygame.version.ver,
+                 'machine': platform.machine(), 'ticks': ticks, 'frames': frames, 'repeat': repeat},
+        'scenarios': results,
+    }
+
+
+def regressions(report, baseline, threshold):
+    """Metrics that fell more than `threshold` (a fraction) below the baseline report"""
+    failed = []
+    for name, base in baseline.get('scenarios', {}).items():
+        current = report['scenarios'].get(name)
+        if current is None:
+            continue
+        for metric in ('ticks_per_sec', 'frames_per_sec'):
+            if current[metric] < base[metric] * (1 - threshold):
+                failed.append((name, metric, base[metric], current[metric]))
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Game scenario benchmarks')
+    parser.add_argument('scenarios', nargs='*', help=f"subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--ticks', type=int, default=2000)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', metavar='FILE', help='write the report here instead of stdout')
+    parser.add_argument('--baseline', metavar='FILE', help='earlier report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='allowed fractional slowdown against --baseline (default 0.15)')
+    parser.add_argument('--broadphase', action='store_true', help='print the broadphase comparison instead')
+    parser.add_argument('--players', action='store_true',
+                        help='print PlayerBatch throughput instead')
+    args = parser.parse_args(argv)
+
+    if args.broadphase:
+        broadphase_report()
+        return 0
+    if args.players:
+        print(json.dumps(player_batch_report(), indent=2))
+        return 0
+
+    report = run_scenarios(args.scenarios or list(SCENARIOS), args.ticks, args.frames, args.repeat)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failed = regressions(report, baseline, args.threshold)
+        for name, metric, base, current in failed:
+            print(f'[bench] REGRESSION {name} {metric}: {base:.0f} -> {current:.0f}', file=sys.stderr)
+        if failed:
+            return 1
+        print(f'[bench] no regressions beyond {args.threshold:.0%} of {args.baseline}', file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
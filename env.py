@@ -0,0 +1,470 @@
+import argparse
+import inspect
+import multiprocessing
+import os
+import random
+import time
+import traceback
+from abc import ABC, abstractmethod
+from multiprocessing import shared_memory
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+
+from game import (SCREEN_HEIGHT, SCREEN_WIDTH, DinoRunner, Game, ScriptedInput, SpawnSchedule)
+
+# Relative positions and sizes are divided by these, so most features land in [-1, 1].
+SCALE = np.array([SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_WIDTH, SCREEN_HEIGHT], dtype=np.float32)
+
+
+def nearest(out, entities, cx, cy):
+    """Fill `out` (k x 5) with (present, dx, dy, w, h) of the k entities nearest (cx, cy), nearest first"""
+    out[:] = 0
+    rects = [e.rect for e in entities if getattr(e, 'visible', True)]
+    if not rects:
+        return
+    rows = np.array([(r.centerx - cx, r.centery - cy, r.w, r.h) for r in rects], dtype=np.float32)
+    dist = rows[:, 0] ** 2 + rows[:, 1] ** 2
+    k = min(len(out), len(rows))
+    if len(rows) > k:
+        idx = np.argpartition(dist, k - 1)[:k]
+        idx = idx[np.argsort(dist[idx])]
+    else:
+        idx = np.argsort(dist)
+    out[:k, 0] = 1
+    out[:k, 1:] = rows[idx] / SCALE
+
+
+class GameEnv(ABC):
+    """reset()/step(action) over a headless Game, driven through ScriptedInput.
+
+    Actions index ACTIONS: (held keys, tapped keys) per discrete action.
+    Each step holds the keys for `frame_skip` simulation steps and returns
+    (obs, reward, terminated, truncated, info), gym-style; the reward is
+    the change in Total_score. Observations are float32 vectors written
+    into `obs`, which may be a view into a caller's buffer (VectorEnv
+    passes rows of its shared memory).
+    """
+    ACTIONS = ((),)
+    observation_size = 0
+
+    def __init__(self, seed=None, frame_skip=1, max_steps=None, level=None, render_every=0, obs=None,
+                 entity_storage='objects'):
+        self.input = ScriptedInput()
+        self.game = Game(headless=True, input_source=self.input, render_every=render_every,
+                         highscore_path=None, seed=seed, level=level, entity_storage=entity_storage)
+        self.game.interpolate = False
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.obs = np.zeros(self.observation_size, dtype=np.float32) if obs is None else obs
+        self.steps = 0
+        self.last_total = 0
+
+    @property
+    def n_actions(self):
+        return len(self.ACTIONS)
+
+    def reset(self, seed=None):
+        game = self.game
+        game.restart(game.rng.getrandbits(63) if seed is None else seed)
+        self.input.held.clear()
+        self.input.pending.clear()
+        self.enter()
+        self.steps = 0
+        self.last_total = game.Total_score
+        self.observe()
+        return self.obs, self.info()
+
+    def enter(self):
+        """Put a freshly restarted game into this env's mode"""
+
+    def step(self, action):
+        held, taps = self.ACTIONS[action]
+        inp = self.input
+        for key in list(inp.held):
+            if key not in held:
+                inp.release(key)
+        for key in held:
+            inp.press(key)
+        for key in taps:
+            inp.tap(key)
+        game = self.game
+        for _ in range(self.frame_skip):
+            game.step()
+            if self.terminated():
+                break
+        self.steps += 1
+        reward = game.Total_score - self.last_total
+        self.last_total = game.Total_score
+        self.observe()
+        truncated = self.max_steps is not None and self.steps >= self.max_steps
+        return self.obs, float(reward), self.terminated(), truncated, self.info()
+
+    def terminated(self):
+        return self.game.lives <= 0
+
+    def info(self):
+        game = self.game
+        return {'score': game.score, 'Total_score': game.Total_score, 'mode': game.game_mode,
+                'lives': game.lives, 'seed': game.seed}
+
+    @abstractmethod
+    def observe(self):
+        """Write the current observation into self.obs"""
+
+
+class PlatformerEnv(GameEnv):
+    """Platformer until game over or the red coin (which switches to hill-climb).
+
+    obs: 12 player features, then (present, dx, dy, w, h) rows for the
+    nearest 8 platforms, 4 enemies, 4 coins, 2 powerups and the red coin,
+    relative to the player centre.
+    """
+    K = pygame.K_LEFT, pygame.K_RIGHT, pygame.K_SPACE
+    ACTIONS = (((), ()), ((K[0],), ()), ((K[1],), ()), ((K[2],), ()),
+               ((K[0], K[2]), ()), ((K[1], K[2]), ()))
+    ROWS = (8, 4, 4, 2, 1)
+    observation_size = 12 + 5 * sum(ROWS)
+
+    def terminated(self):
+        return self.game.lives <= 0 or self.game.game_mode != 'platformer'
+
+    def observe(self):
+        game = self.game
+        game.sync_entities()
+        p = game.player
+        obs = self.obs
+        obs[:12] = (p.x / game.level.width, p.y / SCREEN_HEIGHT, p.vel_x / 10, p.vel_y / 20,
+                    p.on_ground, game.lives / 3, (p.x - game.camera_x) / SCREEN_WIDTH,
+                    p.speed_boost_timer > 0, p.invulnerable_timer > 0, p.reverse_controls > 0,
+                    p.big_jump_timer > 0, game.chaos_timer / 3600)
+        cx, cy = p.rect.center
+        red = [game.red_coin] if game.red_coin else []
+        start = 12
+        for rows, entities in zip(self.ROWS, (game.platforms, game.enemies, game.coins, game.powerups, red)):
+            nearest(obs[start:start + rows * 5].reshape(rows, 5), entities, cx, cy)
+            start += rows * 5
+
+
+class HillClimbEnv(GameEnv):
+    """Hill-climb from a fresh car until the last life is lost.
+
+    obs: 6 car features, the terrain profile 100..800px ahead relative to
+    the ground under the car, then (present, dx, dy, w, h) rows for the 4
+    nearest obstacle cars and the golden coin. The golden coin's dino round
+    plays out over the following steps without agent control; the
+    observation stays on the paused hill-climb meanwhile.
+    """
+    K = pygame.K_RIGHT, pygame.K_LEFT, pygame.K_f
+    ACTIONS = (((), ()), ((K[0],), ()), ((K[1],), ()), ((), (K[2],)), ((K[0],), (K[2],)))
+    AHEAD = tuple(range(100, 900, 100))
+    observation_size = 6 + len(AHEAD) + 5 * 5
+
+    def enter(self):
+        self.game.game_mode = 'hill_climb'
+        self.game.red_coin = None
+
+    def terminated(self):
+        return self.game.lives <= 0 or self.game.game_mode != 'hill_climb'
+
+    def observe(self):
+        game = self.game
+        car = game.car
+        terrain = game.terrain
+        obs = self.obs
+        cx = car.x + car.width / 2
+        ground = terrain.height(cx)
+        obs[:6] = ((ground - car.y - car.height) / SCREEN_HEIGHT, car.vel_x / 10, car.vel_y / 20,
+                   car.fuel / 100, car.slope, game.lives / 3)
+        start = 6
+        for i, ahead in enumerate(self.AHEAD):
+            obs[start + i] = (terrain.height(cx + ahead) - ground) / SCREEN_HEIGHT
+        start += len(self.AHEAD)
+        cy = car.y + car.height / 2
+        nearest(obs[start:start + 20].reshape(4, 5), game.obstacles, cx, cy)
+        coin = [game.golden_coin] if game.golden_coin else []
+        nearest(obs[start + 20:start + 25].reshape(1, 5), coin, cx, cy)
+
+
+class DinoEnv:
+    """reset()/step(action) over a bare DinoRunner (no Game): 0 = run, 1 = jump.
+
+    obs: dino height above ground, vertical speed, on_ground and run speed,
+    then (present, dx, width, height) for the next 3 cactuses ahead. The
+    reward is the change in runner score; a crash ends the episode.
+    """
+    ACTIONS = ((), (pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE),))
+    AHEAD = 3
+    observation_size = 4 + 4 * AHEAD
+
+    SCHEDULE_OPTIONS = frozenset(inspect.signature(SpawnSchedule).parameters) - {'seed'}
+
+    def __init__(self, seed=None, frame_skip=1, max_steps=None, obs=None, **schedule):
+        unknown = sorted(set(schedule) - self.SCHEDULE_OPTIONS)
+        if unknown:
+            raise TypeError(f"DinoEnv got unexpected keyword arguments {unknown}; "
+                            f"SpawnSchedule options are {sorted(self.SCHEDULE_OPTIONS)}")
+        self.seeds = np.random.SeedSequence(seed)
+        self.schedule = schedule
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.obs = np.zeros(self.observation_size, dtype=np.float32) if obs is None else obs
+        self.runner = None
+        self.steps = 0
+
+    @property
+    def n_actions(self):
+        return len(self.ACTIONS)
+
+    def reset(self, seed=None):
+        if seed is None:
+            seed = self.seeds.spawn(1)[0]
+        # The runner gets its own Random so envs never share the module-level one.
+        rng = random.Random(int(np.random.default_rng(seed).integers(2 ** 63)))
+        self.runner = DinoRunner(None, SpawnSchedule(seed, **self.schedule), rng=rng)
+        self.steps = 0
+        self.observe()
+        return self.obs, self.info()
+
+    def step(self, action):
+        runner = self.runner
+        before = runner.score
+        events = self.ACTIONS[action]
+        for _ in range(self.frame_skip):
+            runner.step(events)
+            events = ()
+            if runner.crashed:
+                break
+        self.steps += 1
+        self.observe()
+        truncated = self.max_steps is not None and self.steps >= self.max_steps
+        return self.obs, float(runner.score - before), runner.crashed, truncated, self.info()
+
+    def info(self):
+        runner = self.runner
+        return {'score': runner.score, 'speed': runner.speed, 'distance': runner.distance}
+
+    def observe(self):
+        runner = self.runner
+        dino = runner.dino
+        obs = self.obs
+        obs[:] = 0
+        ground = SCREEN_HEIGHT - 60 - dino.height
+        obs[:4] = ((ground - dino.y) / SCREEN_HEIGHT, dino.vel_y / 20, dino.on_ground, runner.speed / 20)
+        left = runner.distance + dino.x
+        row = 4
+        for c in runner.obstacles:
+            if c.x + c.width < left:
+                continue
+            obs[row:row + 4] = (1, (c.x - left) / SCREEN_WIDTH, c.width / SCREEN_WIDTH, c.height / SCREEN_HEIGHT)
+            row += 4
+            if row >= self.observation_size:
+                break
+
+
+ENVS = {
+    'platformer': PlatformerEnv,
+    'hill_climb': HillClimbEnv,
+    'dino': DinoEnv,
+}
+
+
+def make(name, **kwargs):
+    return ENVS[name](**kwargs)
+
+
+def _layout(num_envs, size):
+    """(name, dtype, shape, offset) of each shared array, and the total bytes"""
+    fields = (('obs', np.float32, (num_envs, size)), ('rewards', np.float64, (num_envs,)),
+              ('terminated', np.bool_, (num_envs,)), ('truncated', np.bool_, (num_envs,)),
+              ('actions', np.int64, (num_envs,)))
+    layout, offset = [], 0
+    for name, dtype, shape in fields:
+        offset = -(-offset // 8) * 8
+        layout.append((name, dtype, shape, offset))
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return layout, offset
+
+
+def _attach(shm, layout):
+    return {name: np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)
+            for name, dtype, shape, offset in layout}
+
+
+def _serve(conn, arrays, name, kwargs, first, seeds):
+    obs, rewards = arrays['obs'], arrays['rewards']
+    terminated, truncated, actions = arrays['terminated'], arrays['truncated'], arrays['actions']
+    envs = [make(name, seed=seed, obs=obs[first + i], **kwargs) for i, seed in enumerate(seeds)]
+    returns = [0.0] * len(envs)
+    lengths = [0] * len(envs)
+    while True:
+        cmd = conn.recv()
+        if cmd == 'step':
+            finished = []
+            for i, env in enumerate(envs):
+                j = first + i
+                _, reward, term, trunc, info = env.step(int(actions[j]))
+                rewards[j] = reward
+                terminated[j] = term
+                truncated[j] = trunc
+                returns[i] += reward
+                lengths[i] += 1
+                if term or trunc:
+                    info['episode'] = {'return': returns[i], 'length': lengths[i]}
+                    finished.append((j, info))
+                    returns[i] = 0.0
+                    lengths[i] = 0
+                    env.reset()
+            conn.send(finished)
+        elif cmd == 'reset':
+            for env in envs:
+                env.reset()
+            returns = [0.0] * len(envs)
+            lengths = [0] * len(envs)
+            conn.send(None)
+        elif cmd == 'close':
+            return
+
+
+def _worker(conn, shm_name, layout, name, kwargs, first, seeds):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        _serve(conn, _attach(shm, layout), name, kwargs, first, seeds)
+    except Exception:
+        conn.send(('error', traceback.format_exc()))
+    finally:
+        shm.close()
+        conn.close()
+
+
+class VectorEnv:
+    """`num_envs` environments stepped in lock-step across `workers` processes.
+
+    Each worker owns a contiguous slice of envs. Observations, rewards,
+    done flags and actions live in one shared-memory block, so a step only
+    sends a short command per worker over its pipe; envs write their
+    observations straight into their rows. Finished envs are reset in the
+    same step: the returned obs row is already the new episode's first
+    observation and `infos` carries the finished episode's stats. The
+    returned arrays are views that the next step() overwrites.
+    """
+    def __init__(self, name, num_envs, workers=None, seed=0, start_method='spawn', **kwargs):
+        self.name = name
+        self.num_envs = num_envs
+        self.n_actions = len(ENVS[name].ACTIONS)
+        workers = min(workers or os.cpu_count() or 1, num_envs)
+        layout, size = _layout(num_envs, ENVS[name].observation_size)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.arrays = _attach(self.shm, layout)
+        seeds = np.random.SeedSequence(seed).generate_state(num_envs, np.uint64).tolist()
+        ctx = multiprocessing.get_context(start_method)
+        self.conns = []
+        self.procs = []
+        bounds = np.linspace(0, num_envs, workers + 1).astype(int)
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_worker, daemon=True,
+                               args=(child, self.shm.name, layout, name, kwargs, int(lo), seeds[lo:hi]))
+            proc.start()
+            child.close()
+            self.conns.append(parent)
+            self.procs.append(proc)
+        self.closed = False
+
+    def _gather(self):
+        results = []
+        for conn in self.conns:
+            try:
+                reply = conn.recv()
+            except (EOFError, OSError) as exc:
+                self.close()
+                raise RuntimeError(f'env worker exited: {exc!r}') from exc
+            if isinstance(reply, tuple) and reply and reply[0] == 'error':
+                self.close()
+                raise RuntimeError(f'env worker failed:\n{reply[1]}')
+            results.append(reply)
+        return results
+
+    def reset(self):
+        for conn in self.conns:
+            conn.send('reset')
+        self._gather()
+        return self.arrays['obs']
+
+    def step(self, actions):
+        a = self.arrays
+        a['actions'][:] = actions
+        for conn in self.conns:
+            conn.send('step')
+        infos = [{} for _ in range(self.num_envs)]
+        for finished in self._gather():
+            for index, info in finished:
+                infos[index] = info
+        return a['obs'], a['rewards'], a['terminated'], a['truncated'], infos
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for conn in self.conns:
+            try:
+                conn.send('close')
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self.procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        self.arrays = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # The caller still holds views from step(); the mapping goes with them.
+            pass
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def throughput(name, num_envs, workers, steps, seed=0, **kwargs):
+    """Random-action env steps/sec: one env in-process, then the vectorized runner"""
+    rng = np.random.default_rng(seed)
+    env = make(name, seed=seed, **kwargs)
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        _, _, term, trunc, _ = env.step(int(rng.integers(env.n_actions)))
+        if term or trunc:
+            env.reset()
+    single = steps / (time.perf_counter() - start)
+    with VectorEnv(name, num_envs, workers, seed=seed, **kwargs) as venv:
+        venv.reset()
+        start = time.perf_counter()
+        for _ in range(steps):
+            venv.step(rng.integers(venv.n_actions, size=num_envs))
+        vector = steps * num_envs / (time.perf_counter() - start)
+    return single, vector
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Env throughput: single env vs the multiprocess runner')
+    parser.add_argument('env', choices=sorted(ENVS))
+    parser.add_argument('--envs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--frame-skip', type=int, default=4)
+    args = parser.parse_args(argv)
+    single, vector = throughput(args.env, args.envs, args.workers, args.steps, frame_skip=args.frame_skip)
+    print(f'[env] {args.env}: single {single:.0f} steps/s, '
+          f'{args.envs} envs x {args.workers or min(os.cpu_count() or 1, args.envs)} workers {vector:.0f} steps/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,77 @@
+import time
+_IMPORT_START = time.perf_counter()
 import pygame
 import os
 import random
 import sys
 import math
+import atexit
+import threading
+import weakref
+import hashlib
+import struct
+import zlib
+import mmap
+import csv
+import json
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque, namedtuple
 import numpy as np
 
-pygame.init()
-pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
-
+HEADLESS = os.environ.get('GAME_HEADLESS') == '1' or '--headless' in sys.argv
+if HEADLESS:
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+
+class StartupTimer:
+    """Where the time from `import game` to the first presented frame goes.
+
+    mark(phase) charges the time since the previous mark to `phase`; marks
+    stop once the first frame is on screen. Work deferred past that point
+    (mixer start, sound synthesis) is timed separately via defer().
+    """
+    def __init__(self, start):
+        self.start = start
+        self.last = start
+        self.phases = {}
+        self.deferred = {}
+        self.first_frame = None
+
+    def mark(self, phase):
+        if self.first_frame is not None:
+            return
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def defer(self, name, seconds):
+        self.deferred[name] = self.deferred.get(name, 0.0) + seconds
+
+    def frame_presented(self):
+        """Returns True for the first frame only"""
+        if self.first_frame is not None:
+            return False
+        self.mark('first_frame')
+        self.first_frame = self.last - self.start
+        return True
+
+    def report(self):
+        return {'phases_ms': {name: round(s * 1000, 3) for name, s in self.phases.items()},
+                'first_frame_ms': None if self.first_frame is None else round(self.first_frame * 1000, 3),
+                'deferred_ms': {name: round(s * 1000, 3) for name, s in self.deferred.items()}}
+
+    def print_report(self):
+        report = self.report()
+        for name, ms in report['phases_ms'].items():
+            print(f'[startup] {name:<14} {ms:8.1f} ms')
+        print(f"[startup] first frame after {report['first_frame_ms']} ms")
+        for name, ms in report['deferred_ms'].items():
+            print(f'[startup] deferred {name:<10} {ms:8.1f} ms')
+
+
+STARTUP = StartupTimer(_IMPORT_START)
+STARTUP.mark('import_pygame')
 
 SCREEN_WIDTH = 1000
 SCREEN_HEIGHT = 600
@@ -16,6 +80,27 @@ PLAYER_SPEED = 5
 JUMP_STRENGTH = -15
 GRAVITY = 0.8
 ENEMY_SPEED = 2
+# Simulation runs at a fixed FPS steps/second; rendering is capped separately.
+FIXED_DT = 1.0 / FPS
+RENDER_FPS = 144
+MAX_CATCH_UP_STEPS = 5
+MAX_FRAME_TIME = 0.25
+# Default high-score file; Game(highscore_path=None) keeps scores in memory only.
+HIGHSCORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'highscore.txt')
+# Game-over and pause screens sleep on the event queue, waking at least this often.
+IDLE_WAIT_MS = 500
+# Platformer entity groups with fewer static entities than this are scanned
+# linearly instead of bucketed in a SpatialHash (see broadphase()).
+BROADPHASE_MIN_ENTITIES = 48
+# Platformer levels are streamed in CHUNK_WIDTH-wide slices around the camera.
+CHUNK_WIDTH = 512
+# Hill-climb road surface (flat baseline) and terrain chunking.
+ROAD_Y = SCREEN_HEIGHT - 150
+TERRAIN_CHUNK = 512
+TERRAIN_SLOTS = 8
+# Dino runner: obstacle ring capacity and how far past the right edge obstacles are queued.
+DINO_OBSTACLES = 64
+DINO_SPAWN_AHEAD = 200
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -32,33 +117,1475 @@ PINK = (255, 192, 203)
 DARK_RED = (139, 0, 0)
 LIME = (0, 255, 0)
 
+AUDIO_SETTINGS = dict(frequency=22050, size=-16, channels=2, buffer=512)
+_audio_ready = None
+
+
+def init_audio():
+    """Start the mixer on first use; False (and no retries) if there is no audio device"""
+    global _audio_ready
+    if _audio_ready is None:
+        start = time.perf_counter()
+        try:
+            pygame.mixer.init(**AUDIO_SETTINGS)
+            _audio_ready = True
+        except pygame.error:
+            _audio_ready = False
+        STARTUP.defer('mixer_init', time.perf_counter() - start)
+    return _audio_ready
+
+
+class ToneSpec(namedtuple('ToneSpec', 'frequency duration volume waveform attack release jitter',
+                          defaults=(0.3, 'sine', 0.0, 0.0, 0.0))):
+    """A synthesized sound: waveform ('sine', 'square', 'triangle', 'saw' or
+    'noise') at `frequency` Hz for `duration` s, linear attack/release ramps in
+    seconds, and a random pitch offset of up to +-`jitter` (a fraction) per play."""
+    __slots__ = ()
+    WAVEFORMS = ('sine', 'square', 'triangle', 'saw', 'noise')
+
+
+def synthesize(spec, rate=22050, channels=2):
+    """int16 PCM (frames, channels) for `spec` at its exact frequency (jitter is ignored)"""
+    frames = int(spec.duration * rate)
+    t = np.linspace(0, spec.duration, frames)
+    if spec.waveform == 'sine':
+        wave = np.sin(2 * np.pi * spec.frequency * t)
+    elif spec.waveform == 'noise':
+        wave = np.random.default_rng(int(spec.frequency * 1000)).uniform(-1.0, 1.0, frames)
+    elif spec.waveform in ToneSpec.WAVEFORMS:
+        phase = spec.frequency * t
+        saw = 2 * (phase - np.floor(phase + 0.5))
+        if spec.waveform == 'saw':
+            wave = saw
+        elif spec.waveform == 'triangle':
+            wave = 2 * np.abs(saw) - 1
+        else:
+            wave = np.where(saw >= 0, 1.0, -1.0)
+    else:
+        raise ValueError(f'unknown waveform {spec.waveform!r}')
+    if spec.attack > 0:
+        n = min(frames, int(spec.attack * rate))
+        wave[:n] *= np.linspace(0, 1, n)
+    if spec.release > 0:
+        n = min(frames, int(spec.release * rate))
+        wave[frames - n:] *= np.linspace(1, 0, n)
+    arr = (wave * spec.volume * 32767).astype(np.int16)
+    return np.repeat(arr.reshape(frames, 1), channels, axis=1)
+
+
+SOUND_CACHE_VERSION = 1
+SOUND_CACHE_DIR = os.environ.get('GAME_SOUND_CACHE') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '.sound_cache')
+
+
+class SoundBank:
+    """pygame Sounds built from ToneSpecs, cached twice.
+
+    The PCM of every (spec, pitch variant) is written to `cache_dir` under a
+    hash of the spec and mixer format, and later launches memory-map it
+    instead of synthesizing. Built Sounds sit in an LRU of `capacity`. A
+    spec with jitter plays one of `variants` evenly spaced pitches, so
+    randomized pitches stop costing anything once each has played.
+    """
+    def __init__(self, cache_dir=SOUND_CACHE_DIR, capacity=64, variants=9):
+        self.cache_dir = cache_dir
+        self.capacity = capacity
+        self.variants = variants
+        # Pitch picks are presentation only; never the simulation rng.
+        self.rng = random.Random()
+        self.sounds = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self.synthesized = 0
+        self.write_errors = 0
+
+    def variant(self, spec):
+        """`spec` at one pitch: jitter resolved to a concrete frequency"""
+        if not spec.jitter:
+            return spec
+        step = self.rng.randrange(self.variants)
+        offset = spec.jitter * (2 * step / (self.variants - 1) - 1) if self.variants > 1 else 0.0
+        return spec._replace(frequency=round(spec.frequency * (1 + offset), 3), jitter=0.0)
+
+    def path(self, spec, fmt):
+        key = hashlib.sha1(repr((SOUND_CACHE_VERSION, tuple(spec), fmt)).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f'{key[:24]}.pcm')
+
+    def get(self, spec):
+        """A Sound for one play of `spec`, or None without an audio device"""
+        spec = self.variant(spec)
+        sound = self.sounds.get(spec)
+        if sound is not None:
+            self.hits += 1
+            self.sounds.move_to_end(spec)
+            return sound
+        if not init_audio():
+            return None
+        self.misses += 1
+        start = time.perf_counter()
+        try:
+            sound = self.sounds[spec] = self.load(spec)
+        except pygame.error:
+            return None
+        STARTUP.defer('sounds', time.perf_counter() - start)
+        if len(self.sounds) > self.capacity:
+            self.sounds.popitem(last=False)
+            self.evictions += 1
+        return sound
+
+    def load(self, spec):
+        rate, size, channels = pygame.mixer.get_init()
+        path = self.path(spec, (rate, size, channels))
+        try:
+            with open(path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as pcm:
+                    if len(pcm) % (2 * channels) == 0:
+                        sound = pygame.mixer.Sound(buffer=pcm)
+                        self.disk_hits += 1
+                        return sound
+        except (OSError, ValueError):
+            pass
+        pcm = synthesize(spec, rate, channels)
+        self.synthesized += 1
+        self.store(path, pcm.tobytes())
+        return pygame.sndarray.make_sound(pcm)
+
+    def store(self, path, data):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            # A read-only install still plays; it just synthesizes every launch.
+            self.write_errors += 1
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def clear(self):
+        self.sounds.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'disk_hits': self.disk_hits, 'synthesized': self.synthesized,
+                'write_errors': self.write_errors, 'cached': len(self.sounds)}
+
+
+SOUNDS = SoundBank()
+
+
 def generate_beep(frequency, duration, volume=0.3):
     """Generate a simple beep sound"""
-    try:
-        frames = int(duration * 22050)
-        arr = np.sin(2 * np.pi * frequency * np.linspace(0, duration, frames))
-        arr = (arr * volume * 32767).astype(np.int16)
-        arr = np.repeat(arr.reshape(frames, 1), 2, axis=1)
-        return pygame.sndarray.make_sound(arr)
-    except:
-        return None
-
-JUMP_SOUND = generate_beep(400, 0.2, 0.2)
-COIN_SOUND = generate_beep(800, 0.3, 0.3)
-POWERUP_SOUND = generate_beep(600, 0.4, 0.25)
-HIT_SOUND = generate_beep(200, 0.5, 0.4)
-ENGINE_SOUND = generate_beep(150, 0.1, 0.1)
-SHOOT_SOUND = generate_beep(1500, 0.06, 0.15)
-BLAST_SOUND = generate_beep(900, 0.18, 0.35)
-DINO_JUMP_SOUND = generate_beep(1200, 0.06, 0.22)
-
-def play_sound(sound):
-    """Safely play a sound"""
-    if sound:
+    return SOUNDS.get(ToneSpec(frequency, duration, volume))
+
+
+class SoundCue(namedtuple('SoundCue', 'spec category priority max_voices', defaults=('effects', 1, 2))):
+    """A ToneSpec and how it competes for mixer channels: the category whose
+    reserved channels it plays on, a priority for voice stealing and a cap on
+    how many copies may sound at once."""
+    __slots__ = ()
+
+
+# Reserved mixer channels per SoundCue category.
+MIXER_CATEGORIES = {'alert': 2, 'player': 2, 'pickup': 3, 'weapon': 4, 'ambient': 1}
+
+
+class ChannelManager:
+    """Mixer voices for SoundCues.
+
+    Every category owns its channels, so a burst in one (weapon fire,
+    pickups) can never take a voice from another (hits). Within a category
+    a cue takes a free channel, else steals the lowest-priority, oldest voice
+    of no higher priority than itself. A cue already at max_voices, or
+    triggered again in the same frame (see begin_frame), is dropped.
+    Per-category counters are in stats().
+    """
+    def __init__(self, categories=MIXER_CATEGORIES):
+        self.categories = dict(categories)
+        self.channels = None
+        self.voices = {}
+        self.serial = 0
+        self.triggered = set()
+        self.counts = {name: {'played': 0, 'stolen': 0, 'capped': 0, 'rate_limited': 0, 'no_voice': 0}
+                       for name in self.categories}
+
+    def begin_frame(self):
+        """Call once per simulation step (Game.sim_step and DinoRunner.step do);
+        repeats of a cue within one step are coalesced"""
+        self.triggered.clear()
+
+    def _open(self):
+        total = sum(self.categories.values())
+        pygame.mixer.set_num_channels(total)
+        # Sound.play() would otherwise pick any idle channel, including ours.
+        pygame.mixer.set_reserved(total)
+        self.channels = {}
+        first = 0
+        for name, count in self.categories.items():
+            self.channels[name] = [pygame.mixer.Channel(i) for i in range(first, first + count)]
+            first += count
+
+    def play(self, cue):
+        """The Channel `cue` started on, or None if it was dropped (or there is no audio)"""
+        counts = self.counts[cue.category]
+        if cue in self.triggered:
+            counts['rate_limited'] += 1
+            return None
+        sound = SOUNDS.get(cue.spec)
+        if sound is None:
+            return None
+        if self.channels is None:
+            self._open()
+        self.triggered.add(cue)
+        free = victim = None
+        copies = 0
+        for channel in self.channels[cue.category]:
+            voice = self.voices.get(channel)
+            if voice is None or not channel.get_busy():
+                if free is None:
+                    free = channel
+                continue
+            playing, serial = voice
+            if playing == cue:
+                copies += 1
+            if playing.priority <= cue.priority and (
+                    victim is None or (playing.priority, serial) < victim_key):
+                victim, victim_key = channel, (playing.priority, serial)
+        if copies >= cue.max_voices:
+            counts['capped'] += 1
+            return None
+        channel = free
+        if channel is None:
+            if victim is None:
+                counts['no_voice'] += 1
+                return None
+            counts['stolen'] += 1
+            channel = victim
+        self.serial += 1
+        self.voices[channel] = (cue, self.serial)
         try:
-            sound.play()
-        except:
+            channel.play(sound)
+        except pygame.error:
+            return None
+        counts['played'] += 1
+        return channel
+
+    def stats(self):
+        totals = {key: sum(c[key] for c in self.counts.values())
+                  for key in ('played', 'stolen', 'capped', 'rate_limited', 'no_voice')}
+        totals['dropped'] = totals['capped'] + totals['rate_limited'] + totals['no_voice']
+        totals['categories'] = {name: dict(c) for name, c in self.counts.items()}
+        return totals
+
+
+CHANNELS = ChannelManager()
+
+JUMP_SOUND = SoundCue(ToneSpec(400, 0.2, 0.2), 'player', 2, 1)
+COIN_SOUND = SoundCue(ToneSpec(800, 0.3, 0.3, jitter=0.06), 'pickup', 1, 3)
+POWERUP_SOUND = SoundCue(ToneSpec(600, 0.4, 0.25), 'pickup', 2, 2)
+HIT_SOUND = SoundCue(ToneSpec(200, 0.5, 0.4), 'alert', 3, 2)
+ENGINE_SOUND = SoundCue(ToneSpec(150, 0.1, 0.1), 'ambient', 0, 1)
+SHOOT_SOUND = SoundCue(ToneSpec(1500, 0.06, 0.15), 'weapon', 1, 2)
+BLAST_SOUND = SoundCue(ToneSpec(900, 0.18, 0.35), 'weapon', 2, 3)
+DINO_JUMP_SOUND = SoundCue(ToneSpec(1200, 0.06, 0.22), 'player', 2, 1)
+
+def play_sound(cue):
+    """Play a SoundCue through CHANNELS; returns its Channel, or None if dropped"""
+    return CHANNELS.play(cue)
+
+
+def use_dummy_display():
+    """Switch the SDL video driver to 'dummy' so no window is created"""
+    if os.environ.get('SDL_VIDEODRIVER') == 'dummy' and pygame.display.get_init():
+        return
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    pygame.display.quit()
+    pygame.display.init()
+
+
+class HighScoreStore:
+    """Coalescing, atomic high-score persistence off the frame loop.
+
+    submit() only records the latest value; a background thread writes it
+    after `delay` seconds (so a scoring streak costs one write) using
+    write-temp-then-rename. The file stays a bare integer, as before.
+    With path=None nothing is read or written; a path that exists but is
+    not a regular file (e.g. /dev/null) is never replaced.
+    """
+    # Stores with possibly unwritten scores, flushed by one atexit handler.
+    live = weakref.WeakSet()
+
+    def __init__(self, path, delay=0.5):
+        self.path = path
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.pending = None
+        self.thread = None
+        self.closed = False
+        self.submits = 0
+        self.writes = 0
+        self.errors = 0
+        if path is not None:
+            HighScoreStore.live.add(self)
+
+    @staticmethod
+    def close_all():
+        for store in list(HighScoreStore.live):
+            store.close()
+
+    def load(self):
+        if self.path is None:
+            return 0
+        try:
+            if os.path.isfile(self.path):
+                with open(self.path, 'r') as f:
+                    return int(f.read().strip() or 0)
+        except Exception:
             pass
+        return 0
+
+    def submit(self, value):
+        with self.lock:
+            self.submits += 1
+            if self.path is None:
+                return
+            self.pending = int(value)
+            if self.thread is None and not self.closed:
+                self.thread = threading.Thread(target=self._run, name='highscore-writer', daemon=True)
+                self.thread.start()
+        self.wake.set()
+
+    def _run(self):
+        while not self.closed:
+            self.wake.wait()
+            if self.closed:
+                break
+            time.sleep(self.delay)
+            self.wake.clear()
+            self.flush()
+
+    def _write(self, value):
+        if os.path.exists(self.path) and not os.path.isfile(self.path):
+            self.errors += 1
+            return
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(str(value))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.writes += 1
+        except Exception:
+            self.errors += 1
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def flush(self):
+        """Write any pending value now (safe from any thread)"""
+        with self.write_lock:
+            with self.lock:
+                value, self.pending = self.pending, None
+            if value is not None:
+                self._write(value)
+
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.flush()
+        HighScoreStore.live.discard(self)
+
+    def stats(self):
+        return {'submits': self.submits, 'writes': self.writes, 'errors': self.errors}
+
+
+atexit.register(HighScoreStore.close_all)
+
+
+class KeyState:
+    """Indexable stand-in for pygame.key.get_pressed() built from a set of held keys"""
+    def __init__(self, held=()):
+        self.held = frozenset(held)
+
+    def __getitem__(self, key):
+        return key in self.held
+
+
+class KeyboardInput:
+    """Live input: the real keyboard and the pygame event queue"""
+    waits_for_input = True
+
+    def __init__(self):
+        self.pending = []
+
+    def get_pressed(self):
+        return pygame.key.get_pressed()
+
+    def get_events(self):
+        events = pygame.event.get()
+        if self.pending:
+            events = self.pending + events
+            self.pending = []
+        return events
+
+    def wait(self, timeout):
+        """Sleep until an event is queued or `timeout` ms pass; the event is kept for get_events()"""
+        if self.pending or pygame.event.peek():
+            return
+        event = pygame.event.wait(timeout)
+        if event.type != pygame.NOEVENT:
+            self.pending.append(event)
+
+
+class ScriptedInput:
+    """Injectable input source for bots and headless runs.
+
+    `script(inp)` is called once per polled frame (including frames of the
+    embedded dino loop) and can press/release/tap keys on `inp`.
+    """
+    waits_for_input = False
+
+    def __init__(self, script=None):
+        self.script = script
+        self.held = set()
+        self.pending = []
+        self.frame = 0
+
+    def press(self, key):
+        if key not in self.held:
+            self.held.add(key)
+            self.pending.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+
+    def release(self, key):
+        if key in self.held:
+            self.held.discard(key)
+            self.pending.append(pygame.event.Event(pygame.KEYUP, key=key))
+
+    def tap(self, key):
+        self.pending.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+        self.pending.append(pygame.event.Event(pygame.KEYUP, key=key))
+
+    def quit(self):
+        self.pending.append(pygame.event.Event(pygame.QUIT))
+
+    def get_pressed(self):
+        return KeyState(self.held)
+
+    def get_events(self):
+        if self.script is not None:
+            self.script(self)
+        self.frame += 1
+        events = self.pending
+        self.pending = []
+        return events
+
+REPLAY_MAGIC = b'DMRP'
+REPLAY_VERSION = 1
+# Held keys read by Player.update / Car.update, stored as one bitmask byte per frame.
+REPLAY_HELD_KEYS = (pygame.K_LEFT, pygame.K_a, pygame.K_RIGHT, pygame.K_d,
+                    pygame.K_SPACE, pygame.K_UP, pygame.K_w)
+
+
+def _write_varint(buf, value):
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class InputRecorder:
+    """Wraps an input source and records every polled frame for replay.
+
+    A frame is one get_events() poll (Game.handle_events or a dino-loop
+    iteration). The stream is run-length coded: a run of frames with the
+    same held-key mask and no KEYDOWN/QUIT events costs a few bytes, and
+    the whole body is zlib-compressed on save.
+    """
+    def __init__(self, source, path=None):
+        self.source = source
+        self.path = path
+        self.waits_for_input = source.waits_for_input
+        if hasattr(source, 'wait'):
+            self.wait = source.wait
+        self.body = bytearray()
+        self.frames = 0
+        self.mask = 0
+        self.run = 0
+        self.states = {}
+
+    def _flush_run(self):
+        if self.run:
+            self.body.append(0x00)
+            self.body.append(self.mask)
+            _write_varint(self.body, self.run)
+            self.run = 0
+
+    def get_events(self):
+        events = self.source.get_events()
+        pressed = self.source.get_pressed()
+        mask = 0
+        for bit, key in enumerate(REPLAY_HELD_KEYS):
+            if pressed[key]:
+                mask |= 1 << bit
+        codes = [0 if e.type == pygame.QUIT else e.key + 1 for e in events
+                 if e.type == pygame.QUIT or e.type == pygame.KEYDOWN]
+        if codes or mask != self.mask:
+            self._flush_run()
+            self.mask = mask
+        if codes:
+            self.body.append(0x01)
+            self.body.append(mask)
+            _write_varint(self.body, len(codes))
+            for code in codes:
+                _write_varint(self.body, code)
+        else:
+            self.run += 1
+        self.frames += 1
+        return events
+
+    def get_pressed(self):
+        state = self.states.get(self.mask)
+        if state is None:
+            state = self.states[self.mask] = KeyState(
+                key for bit, key in enumerate(REPLAY_HELD_KEYS) if self.mask & (1 << bit))
+        return state
+
+    def to_bytes(self, seed, state_hash):
+        self._flush_run()
+        body = bytes(self.body) + b'\xff' + struct.pack('<Q', self.frames) + state_hash
+        header = REPLAY_MAGIC + struct.pack('<BBQ', REPLAY_VERSION, int(self.waits_for_input), seed)
+        return header + zlib.compress(body, 9)
+
+    def save(self, path, game):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes(game.session_seed, game.state_hash()))
+
+    def finish(self, game):
+        if self.path:
+            self.save(self.path, game)
+            print(f'[replay] recorded {self.frames} frames to {self.path}')
+
+
+class ReplayInput:
+    """Plays back an InputRecorder stream; emits QUIT once it runs out"""
+    def __init__(self, data):
+        if data[:4] != REPLAY_MAGIC:
+            raise ValueError('not a replay stream')
+        version, waits, self.seed = struct.unpack_from('<BBQ', data, 4)
+        if version != REPLAY_VERSION:
+            raise ValueError(f'unsupported replay version {version}')
+        self.waits_for_input = False
+        self.recorded_waits = bool(waits)
+        body = zlib.decompress(data[4 + struct.calcsize('<BBQ'):])
+        end = len(body) - 41
+        self.body = body[:end]
+        self.frames, = struct.unpack_from('<Q', body, end + 1)
+        self.expected_hash = body[end + 9:end + 41]
+        self.pos = 0
+        self.remaining_run = 0
+        self.mask = 0
+        self.played = 0
+        self.exhausted = False
+        self.states = {}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def has_more(self):
+        return self.remaining_run > 0 or self.pos < len(self.body)
+
+    def get_events(self):
+        if self.remaining_run:
+            self.remaining_run -= 1
+            self.played += 1
+            return []
+        if self.pos >= len(self.body):
+            self.exhausted = True
+            return [pygame.event.Event(pygame.QUIT)]
+        body = self.body
+        tag = body[self.pos]
+        self.mask = body[self.pos + 1]
+        self.pos += 2
+        self.played += 1
+        if tag == 0x00:
+            run, self.pos = _read_varint(body, self.pos)
+            self.remaining_run = run - 1
+            return []
+        count, self.pos = _read_varint(body, self.pos)
+        events = []
+        for _ in range(count):
+            code, self.pos = _read_varint(body, self.pos)
+            if code == 0:
+                events.append(pygame.event.Event(pygame.QUIT))
+            else:
+                events.append(pygame.event.Event(pygame.KEYDOWN, key=code - 1))
+        return events
+
+    def get_pressed(self):
+        state = self.states.get(self.mask)
+        if state is None:
+            state = self.states[self.mask] = KeyState(
+                key for bit, key in enumerate(REPLAY_HELD_KEYS) if self.mask & (1 << bit))
+        return state
+
+
+def replay_session(path, render_every=0):
+    """Re-run a recorded session headless at full speed; returns (ok, frames, seconds)"""
+    replay = ReplayInput.load(path)
+    game = Game(headless=True, input_source=replay, render_every=render_every,
+                highscore_path=None, seed=replay.seed)
+    start = time.perf_counter()
+    while game.running and replay.has_more():
+        game.step()
+    elapsed = time.perf_counter() - start
+    ok = game.state_hash() == replay.expected_hash and replay.played == replay.frames
+    return ok, replay.played, elapsed
+
+
+class FixedStepClock:
+    """Accumulator for a fixed-rate simulation decoupled from the render rate.
+
+    advance() returns how many FIXED_DT steps are due since the last call,
+    capped at `max_steps`; a larger backlog is dropped rather than letting
+    slow frames spiral. `alpha` is the leftover fraction of a step, used to
+    interpolate rendering between the last two simulation states.
+    """
+    def __init__(self, dt=FIXED_DT, max_steps=MAX_CATCH_UP_STEPS, max_frame_time=MAX_FRAME_TIME):
+        self.dt = dt
+        self.max_steps = max_steps
+        self.max_frame_time = max_frame_time
+        self.accumulator = 0.0
+        self.previous = None
+        self.dropped_steps = 0
+
+    def reset(self):
+        self.previous = time.perf_counter()
+        self.accumulator = 0.0
+
+    def advance(self):
+        now = time.perf_counter()
+        if self.previous is None:
+            self.previous = now
+        self.accumulator += min(now - self.previous, self.max_frame_time)
+        self.previous = now
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_steps:
+            self.dropped_steps += steps - self.max_steps
+            steps = self.max_steps
+            self.accumulator %= self.dt
+        else:
+            self.accumulator -= steps * self.dt
+        return steps
+
+    @property
+    def alpha(self):
+        return min(1.0, self.accumulator / self.dt)
+
+
+def capture_positions(entities, stamp):
+    """Remember where entities were before simulation step `stamp`"""
+    for e in entities:
+        e.prev_pos = (e.x, e.y, stamp)
+
+
+def lerp_positions(entities, stamp, alpha, max_jump=100):
+    """Temporarily move entities to their interpolated render position.
+
+    Only entities captured before step `stamp` are moved, and large jumps
+    (respawns, teleports) are drawn at their current position. Returns the
+    state for restore_positions().
+    """
+    saved = []
+    if alpha >= 1.0:
+        return saved
+    for e in entities:
+        prev = getattr(e, 'prev_pos', None)
+        if prev is None or prev[2] != stamp:
+            continue
+        x, y = e.x, e.y
+        dx = x - prev[0]
+        dy = y - prev[1]
+        if (dx == 0 and dy == 0) or abs(dx) > max_jump or abs(dy) > max_jump:
+            continue
+        rect = getattr(e, 'rect', None)
+        saved.append((e, x, y, rect, rect.topleft if rect is not None else None))
+        back = 1.0 - alpha
+        e.x = x - dx * back
+        e.y = y - dy * back
+        if rect is not None:
+            rect.x += int(round(e.x - x))
+            rect.y += int(round(e.y - y))
+    return saved
+
+
+def restore_positions(saved):
+    for e, x, y, rect, topleft in saved:
+        e.x = x
+        e.y = y
+        if rect is not None:
+            rect.topleft = topleft
+
+
+class SpatialHash:
+    """Uniform-grid broadphase for anything with a `rect`.
+
+    Entities are bucketed into every cell their rect overlaps. `query(rect)`
+    returns only the entities sharing a cell with `rect`, in registration
+    order, so callers keep the same resolution order as a linear scan.
+    """
+    def __init__(self, cell_size=128, entities=()):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}
+        self.counter = 0
+        for entity in entities:
+            self.insert(entity)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, entity):
+        return entity in self.entries
+
+    def _span(self, rect):
+        cs = self.cell_size
+        x0 = rect.left // cs
+        y0 = rect.top // cs
+        x1 = max(x0, (rect.right - 1) // cs)
+        y1 = max(y0, (rect.bottom - 1) // cs)
+        return (x0, y0, x1, y1)
+
+    def _link(self, entity, order, span):
+        x0, y0, x1, y1 = span
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    cells[(cx, cy)] = {entity: order}
+                else:
+                    cell[entity] = order
+
+    def _unlink(self, entity, span):
+        x0, y0, x1, y1 = span
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell is not None:
+                    cell.pop(entity, None)
+                    if not cell:
+                        del cells[(cx, cy)]
+
+    def insert(self, entity):
+        if entity in self.entries:
+            self.move(entity)
+            return
+        span = self._span(entity.rect)
+        self.counter += 1
+        self.entries[entity] = (self.counter, span)
+        self._link(entity, self.counter, span)
+
+    def remove(self, entity):
+        entry = self.entries.pop(entity, None)
+        if entry is not None:
+            self._unlink(entity, entry[1])
+
+    def move(self, entity):
+        """Re-bucket an entity after its rect changed (cheap if it stayed in its cells)"""
+        order, span = self.entries[entity]
+        new_span = self._span(entity.rect)
+        if new_span != span:
+            self._unlink(entity, span)
+            self._link(entity, order, new_span)
+            self.entries[entity] = (order, new_span)
+
+    def clear(self):
+        self.cells.clear()
+        self.entries.clear()
+
+    def query(self, rect):
+        """Candidates whose cells overlap `rect` (narrowphase is up to the caller)"""
+        x0, y0, x1, y1 = self._span(rect)
+        cells = self.cells
+        if x0 == x1 and y0 == y1:
+            cell = cells.get((x0, y0))
+            if not cell:
+                return []
+            return sorted(cell, key=cell.__getitem__) if len(cell) > 1 else list(cell)
+        found = {}
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell:
+                    found.update(cell)
+        if len(found) > 1:
+            return sorted(found, key=found.__getitem__)
+        return list(found)
+
+    def colliding(self, rect):
+        return [e for e in self.query(rect) if rect.colliderect(e.rect)]
+
+
+class EntityList:
+    """Linear-scan stand-in for SpatialHash, for groups too small to be worth bucketing.
+
+    Same API; query() is every entity in registration order and move() is
+    free, so it beats the grid for small or mostly moving groups.
+    """
+    def __init__(self, entities=()):
+        self.entries = dict.fromkeys(entities)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, entity):
+        return entity in self.entries
+
+    def insert(self, entity):
+        self.entries[entity] = None
+
+    def remove(self, entity):
+        self.entries.pop(entity, None)
+
+    def move(self, entity):
+        pass
+
+    def clear(self):
+        self.entries.clear()
+
+    def query(self, rect):
+        return list(self.entries)
+
+    def colliding(self, rect):
+        return [e for e in self.entries if rect.colliderect(e.rect)]
+
+
+def broadphase(entities, static=None, cell_size=128):
+    """SpatialHash over `entities`, or an EntityList when bucketing wouldn't pay.
+
+    `static` counts the entities that never move (default: all of them).
+    Only those make the grid worthwhile: a mover costs a move() every step,
+    which is dearer than the colliderect a scan spends on it.
+    """
+    if (len(entities) if static is None else static) < BROADPHASE_MIN_ENTITIES:
+        return EntityList(entities)
+    return SpatialHash(cell_size, entities)
+
+
+def rect_coords(values):
+    """int64 copy of `values` as pygame stores them when assigned to a Rect
+    attribute: floats round half away from zero"""
+    if values.dtype.kind in 'iub':
+        return values.astype(np.int64)
+    whole = np.trunc(values)
+    halves = np.abs(values - whole) == 0.5
+    return np.where(halves, whole + np.sign(values), np.rint(values)).astype(np.int64)
+
+
+class EntityArrays:
+    """Struct-of-arrays stand-in for a SpatialHash over level entities
+    (Game(entity_storage='arrays')).
+
+    Rects are int64 columns, one row per entity in list order, so query()
+    and colliding() are one vectorized pass each and return the same
+    entities, in the same order, as the SpatialHash calls they replace.
+    Subclasses keep per-kind state (positions, directions, patrol bounds,
+    timers) in columns too and advance every row at once in step(). The
+    entity objects are only written by sync(), when something outside the
+    simulation reads them; entities handed out by query()/colliding() are
+    brought up to date first and whatever is written to them is read back
+    before the next step() or sync().
+    """
+    # (rows, row set, attribute names) of the state step() changes, set by subclasses.
+    groups = ()
+    # name -> bool per row: rows of a float column whose entity keeps an int value
+    integral = {}
+
+    def __init__(self, entities=(), cell_size=128):
+        self.entities = list(entities)
+        self.cell_size = cell_size
+        self.rows = {id(e): i for i, e in enumerate(self.entities)}
+        rects = [e.rect for e in self.entities]
+        self.rx = np.array([r.x for r in rects], dtype=np.int64)
+        self.ry = np.array([r.y for r in rects], dtype=np.int64)
+        self.rw = np.array([r.w for r in rects], dtype=np.int64)
+        self.rh = np.array([r.h for r in rects], dtype=np.int64)
+        self.alive = np.ones(len(self.entities), dtype=bool)
+        self.moving = np.zeros(0, dtype=np.int64)
+        self.lent = set()
+        self.stale = False
+        self.prev_x = None
+        self.prev_stamp = None
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def __contains__(self, entity):
+        row = self.rows.get(id(entity))
+        return row is not None and bool(self.alive[row])
+
+    def column(self, name, default=0, rows=None):
+        entities = self.entities if rows is None else [self.entities[i] for i in rows]
+        return np.array([getattr(e, name, default) for e in entities])
+
+    def values(self, name, rows):
+        """Python values of column `name` at `rows`, typed as the entity objects hold them"""
+        values = getattr(self, name)[rows].tolist()
+        flags = self.integral.get(name)
+        if flags is not None:
+            values = [int(v) if f else v for v, f in zip(values, flags[rows].tolist())]
+        return values
+
+    def position_column(self):
+        """x as one column wide enough for x + speed; rows that the objects
+        would keep as ints are flagged in `integral` so sync() writes ints back"""
+        x = self.column('x')
+        if not len(x):
+            return x
+        x = x.astype(np.result_type(x, self.speed))
+        if x.dtype.kind == 'f':
+            flags = np.array([isinstance(e.x, int) and isinstance(getattr(e, 'speed', 0), int)
+                              for e in self.entities])
+            if flags.any():
+                self.integral = {'x': flags}
+        return x
+
+    def _lend(self, mask):
+        rows = np.flatnonzero(mask).tolist()
+        if rows and self.groups:
+            if self.stale:
+                self.sync_rows(rows)
+            self.lent.update(rows)
+        entities = self.entities
+        return [entities[i] for i in rows]
+
+    def query(self, rect):
+        """Entities sharing a broadphase cell with `rect`, like SpatialHash.query"""
+        cs = self.cell_size
+        x0 = rect.left // cs
+        y0 = rect.top // cs
+        x1 = max(x0, (rect.right - 1) // cs)
+        y1 = max(y0, (rect.bottom - 1) // cs)
+        left = self.rx // cs
+        top = self.ry // cs
+        mask = (self.alive & (left <= x1) & (top <= y1)
+                & (np.maximum(left, (self.rx + self.rw - 1) // cs) >= x0)
+                & (np.maximum(top, (self.ry + self.rh - 1) // cs) >= y0))
+        return self._lend(mask)
+
+    def colliding(self, rect):
+        """Entities whose rect overlaps `rect` (Rect.colliderect semantics)"""
+        if rect.w <= 0 or rect.h <= 0:
+            return []
+        rx, ry = self.rx, self.ry
+        mask = (self.alive & (self.rw > 0) & (self.rh > 0)
+                & (rx < rect.right) & (rx + self.rw > rect.x)
+                & (ry < rect.bottom) & (ry + self.rh > rect.y))
+        return self._lend(mask)
+
+    def remove(self, entity):
+        row = self.rows.get(id(entity))
+        if row is not None:
+            self.alive[row] = False
+
+    def move(self, entity):
+        """Nothing to re-bucket: step() keeps the rect columns current"""
+
+    def step(self):
+        pass
+
+    def capture(self, stamp):
+        """capture_positions() for the moving rows, as one array copy"""
+        self.checkin()
+        self.prev_x = self.x[self.moving]
+        self.prev_stamp = stamp
+        self.stale = True  # prev_pos is owed even if no step() follows
+
+    def checkin(self):
+        """Read back state written to handed-out entities"""
+        if not self.lent:
+            return
+        entities = self.entities
+        for _, members, names in self.groups:
+            for row in self.lent.intersection(members):
+                e = entities[row]
+                for name in names:
+                    getattr(self, name)[row] = getattr(e, name)
+                self.rx[row] = e.rect.x
+        self.lent.clear()
+
+    def sync_rows(self, rows):
+        entities = self.entities
+        for _, members, names in self.groups:
+            for row in members.intersection(rows):
+                e = entities[row]
+                for name in names:
+                    setattr(e, name, self.values(name, [row])[0])
+                e.rect.x = self.rx[row].item()
+
+    def sync(self):
+        """Write the columns back to every entity object (and their prev_pos for interpolation)"""
+        self.checkin()
+        if not self.stale:
+            return
+        self.stale = False
+        entities = self.entities
+        for rows, _, names in self.groups:
+            group = [entities[i] for i in rows.tolist()]
+            for name in names:
+                for e, value in zip(group, self.values(name, rows)):
+                    setattr(e, name, value)
+            for e, x in zip(group, self.rx[rows].tolist()):
+                e.rect.x = x
+        if self.prev_x is not None:
+            stamp = self.prev_stamp
+            moving = self.moving
+            prev_x = self.prev_x.tolist()
+            flags = self.integral.get('x')
+            if flags is not None:
+                prev_x = [int(v) if f else v for v, f in zip(prev_x, flags[moving].tolist())]
+            for e, x in zip([entities[i] for i in moving.tolist()], prev_x):
+                e.prev_pos = (x, e.y, stamp)
+
+
+class PlatformArrays(EntityArrays):
+    """Platforms as columns: MovingPlatform patrols and DisappearingPlatform timers step together"""
+    def __init__(self, entities=(), cell_size=128):
+        super().__init__(entities, cell_size)
+        kinds = self.entities
+        self.moving = np.array([i for i, p in enumerate(kinds) if isinstance(p, MovingPlatform)], dtype=np.int64)
+        self.disappearing = np.array([i for i, p in enumerate(kinds) if isinstance(p, DisappearingPlatform)],
+                                     dtype=np.int64)
+        self.speed = self.column('speed')
+        self.direction = self.column('direction').astype(np.int64)
+        self.start_x = self.column('start_x')
+        self.end_x = self.column('end_x')
+        self.x = self.position_column()
+        self.timer = self.column('timer').astype(np.int64)
+        self.touch_timer = self.column('touch_timer').astype(np.int64)
+        self.visible = self.column('visible', True).astype(bool)
+        self.groups = ((self.moving, set(self.moving.tolist()), ('x', 'direction')),
+                       (self.disappearing, set(self.disappearing.tolist()), ('timer', 'touch_timer', 'visible')))
+
+    def step(self):
+        self.checkin()
+        m = self.moving
+        if len(m):
+            x = self.x[m] + self.speed[m] * self.direction[m]
+            self.x[m] = x
+            self.direction[m[(x <= self.start_x[m]) | (x >= self.end_x[m])]] *= -1
+            self.rx[m] = rect_coords(x)
+        d = self.disappearing
+        if len(d):
+            self.timer[d] += 1
+            touch = self.touch_timer[d]
+            counting = touch > 0
+            touch = touch - counting
+            self.touch_timer[d] = touch
+            flip = d[counting & (touch <= 0)]
+            self.visible[flip] = ~self.visible[flip]
+        self.stale = True
+
+
+class EnemyArrays(EntityArrays):
+    """Enemies as columns: every patrol moves and turns around in one pass"""
+    def __init__(self, entities=(), cell_size=128):
+        super().__init__(entities, cell_size)
+        self.moving = np.arange(len(self.entities), dtype=np.int64)
+        self.speed = self.column('speed')
+        self.direction = self.column('direction').astype(np.int64)
+        self.platform_left = self.column('platform_left')
+        self.platform_right = self.column('platform_right')
+        self.width = self.column('width')
+        self.x = self.position_column()
+        self.groups = ((self.moving, set(self.moving.tolist()), ('x', 'direction')),)
+
+    def step(self):
+        self.checkin()
+        if not len(self.x):
+            return
+        x = self.x + self.speed * self.direction
+        self.x = x
+        self.direction[(x <= self.platform_left) | (x >= self.platform_right - self.width)] *= -1
+        self.rx = rect_coords(x)
+        self.stale = True
+
+
+class EntityPool:
+    """Fixed-capacity object pool.
+
+    Live objects are kept densely in `active` and removed by swapping the
+    last one into the hole, so release() is O(1). Released objects go on a
+    free-list and are recycled through their `reset()` on the next spawn.
+    Iterate backwards by index when releasing during a loop.
+    """
+    def __init__(self, cls, capacity):
+        self.cls = cls
+        self.capacity = capacity
+        self.active = []
+        self.free = []
+        self.high_water = 0
+        self.spawned = 0
+        self.recycled = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.active)
+
+    def __iter__(self):
+        return iter(self.active)
+
+    def __getitem__(self, index):
+        return self.active[index]
+
+    def spawn(self, *args):
+        active = self.active
+        if len(active) >= self.capacity:
+            self.dropped += 1
+            return None
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+            self.recycled += 1
+        else:
+            obj = self.cls(*args)
+        obj.pool_index = len(active)
+        active.append(obj)
+        self.spawned += 1
+        if len(active) > self.high_water:
+            self.high_water = len(active)
+        return obj
+
+    def release(self, obj):
+        active = self.active
+        index = obj.pool_index
+        last = active.pop()
+        if last is not obj:
+            active[index] = last
+            last.pool_index = index
+        obj.pool_index = -1
+        self.free.append(obj)
+
+    def clear(self):
+        for obj in self.active:
+            obj.pool_index = -1
+        self.free.extend(self.active)
+        self.active.clear()
+
+    def stats(self):
+        return {'active': len(self.active), 'high_water': self.high_water,
+                'capacity': self.capacity, 'spawned': self.spawned,
+                'recycled': self.recycled, 'dropped': self.dropped}
+
+
+class TextCache:
+    """Fonts loaded once plus an LRU of rendered text surfaces keyed by (font, text, color)"""
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def font(self, size, name=None):
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = self.fonts[key] = pygame.font.Font(name, size)
+        return font
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = self.surfaces[key] = font.render(text, True, color)
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+            self.evictions += 1
+        return surf
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'cached': len(self.surfaces), 'fonts': len(self.fonts)}
+
+
+TEXT_CACHE = TextCache()
+
+
+class HudField:
+    """One HUD string; formats and re-renders only when its value changes"""
+    def __init__(self, size, template, color=BLACK, cache=TEXT_CACHE):
+        self.cache = cache
+        self.font = cache.font(size)
+        self.template = template
+        self.color = color
+        self.value = None
+        self.surf = None
+        self.renders = 0
+        self.reuses = 0
+
+    def surface(self, value):
+        if self.surf is None or value != self.value:
+            self.value = value
+            self.surf = self.cache.render(self.font, self.template.format(value), self.color)
+            self.renders += 1
+        else:
+            self.reuses += 1
+        return self.surf
+
+
+class FrameProfiler:
+    """Per-phase frame timings with rolling percentiles.
+
+    Call sites bracket a phase with `t = profiler.start()` and
+    `profiler.stop('phase', t)`; while disabled both are a single branch.
+    Phases may nest (e.g. 'enemies' inside 'update') and may run several
+    times per frame, in which case their time is summed. end_frame() closes
+    the current frame: the totals go into a rolling window per phase for the
+    overlay and into a bounded per-frame history for export.
+    """
+    def __init__(self, window=600, history=216000, enabled=False):
+        self.enabled = enabled
+        self.window = window
+        self.history = deque(maxlen=history)
+        self.recent = {}
+        self.current = {}
+        self.phases = []
+        self.frame_start = None
+        self.frames = 0
+        self.overlay = False
+        self.overlay_surface = None
+        self.overlay_age = 0
+        self.font = None
+
+    def start(self):
+        return time.perf_counter() if self.enabled else 0.0
+
+    def stop(self, phase, start):
+        if self.enabled:
+            elapsed = time.perf_counter() - start
+            current = self.current
+            current[phase] = current.get(phase, 0.0) + elapsed
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        current = self.current
+        if self.frame_start is not None:
+            current['total'] = now - self.frame_start
+        self.frame_start = now
+        for phase, seconds in current.items():
+            samples = self.recent.get(phase)
+            if samples is None:
+                samples = self.recent[phase] = deque(maxlen=self.window)
+                self.phases.append(phase)
+            samples.append(seconds * 1000.0)
+        self.history.append((self.frames, current))
+        self.current = {}
+        self.frames += 1
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.enabled = self.enabled or self.overlay
+        self.overlay_surface = None
+
+    @staticmethod
+    def percentiles(samples):
+        values = np.fromiter(samples, dtype=np.float64, count=len(samples))
+        p50, p95, p99 = np.percentile(values, (50, 95, 99))
+        return {'count': len(values), 'mean_ms': float(values.mean()), 'p50_ms': float(p50),
+                'p95_ms': float(p95), 'p99_ms': float(p99), 'max_ms': float(values.max())}
+
+    def summary(self, recent=True):
+        """{phase: count/mean/p50/p95/p99/max in ms}, over the rolling window or the whole history"""
+        result = {}
+        for phase in self.phases:
+            if recent:
+                samples = self.recent[phase]
+            else:
+                samples = [row[phase] * 1000.0 for _, row in self.history if phase in row]
+            if samples:
+                result[phase] = self.percentiles(samples)
+        return result
+
+    def overlay_items(self, refresh=30):
+        """(surface, rect) for the overlay, re-rendered every `refresh` frames"""
+        if not self.overlay or not self.phases:
+            return []
+        self.overlay_age += 1
+        if self.overlay_surface is None or self.overlay_age >= refresh:
+            self.overlay_age = 0
+            if self.font is None:
+                self.font = pygame.font.SysFont('monospace', 16)
+            font = self.font
+            lines = [f"{'phase':<18}{'p50':>7}{'p95':>7}{'p99':>7} ms"]
+            for phase, s in self.summary().items():
+                lines.append(f"{phase:<18}{s['p50_ms']:>7.2f}{s['p95_ms']:>7.2f}{s['p99_ms']:>7.2f}")
+            height = font.get_linesize()
+            width = max(font.size(line)[0] for line in lines)
+            surf = pygame.Surface((width + 12, height * len(lines) + 8), pygame.SRCALPHA)
+            surf.fill((0, 0, 0, 170))
+            for i, line in enumerate(lines):
+                surf.blit(font.render(line, True, WHITE), (6, 4 + i * height))
+            self.overlay_surface = surf
+        surf = self.overlay_surface
+        return [(surf, surf.get_rect(topright=(SCREEN_WIDTH - 10, 60)))]
+
+    def export(self, path):
+        """Write `path` as JSON (summary + per-frame rows) or CSV (per-frame rows)"""
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['frame'] + [phase + '_ms' for phase in self.phases])
+                for frame, row in self.history:
+                    writer.writerow([frame] + [f'{row[p] * 1000.0:.4f}' if p in row else ''
+                                               for p in self.phases])
+        else:
+            data = {
+                'frames': self.frames,
+                'summary': self.summary(recent=False),
+                'rows': [dict(frame=frame, **{p: round(s * 1000.0, 4) for p, s in row.items()})
+                         for frame, row in self.history],
+            }
+            with open(path, 'w') as f:
+                json.dump(data, f, indent=1)
+        print(f'[profiler] wrote {len(self.history)} frames to {path}')
+
+
+class FrameCapture:
+    """Render-surface frames as NumPy arrays for pixel-based agents and visual checks.
+
+    view() is a zero-copy surfarray.pixels3d view, (width, height, 3)
+    uint8; it keeps the surface locked, so drop it before the next blit.
+    capture() reduces the surface into preallocated buffers without
+    allocating: every `scale`-th pixel each way (nearest-neighbour, sliced
+    from the view), optionally grayscale, pushed onto `frames`, the last
+    `stack` captures oldest first as (stack, h, w) or (stack, h, w, 3).
+    """
+    # ITU-R 601 luma weights scaled to sum to 256.
+    LUMA = (77, 150, 29)
+
+    def __init__(self, size=(SCREEN_WIDTH, SCREEN_HEIGHT), scale=1, grayscale=False, stack=1):
+        self.scale = scale
+        self.grayscale = grayscale
+        width, height = -(-size[0] // scale), -(-size[1] // scale)
+        shape = (stack, height, width) if grayscale else (stack, height, width, 3)
+        self.frames = np.zeros(shape, np.uint8)
+        self.luma = np.empty((2, height, width), np.uint16) if grayscale else None
+        self.captured = 0
+
+    @staticmethod
+    def view(surface):
+        return pygame.surfarray.pixels3d(surface)
+
+    def capture(self, surface):
+        frames = self.frames
+        for i in range(len(frames) - 1):
+            frames[i] = frames[i + 1]
+        self._reduce(pygame.surfarray.pixels3d(surface), frames[-1])
+        self.captured += 1
+        return frames
+
+    def _reduce(self, pixels, out):
+        src = pixels[::self.scale, ::self.scale].transpose(1, 0, 2)
+        # One plane at a time: numpy copies a 3-wide interleaved inner axis
+        # several times slower than whole rows.
+        if not self.grayscale:
+            for channel in range(3):
+                out[..., channel] = src[..., channel]
+            return
+        acc, term = self.luma
+        np.copyto(acc, src[..., 0])
+        np.multiply(acc, self.LUMA[0], out=acc)
+        for channel in (1, 2):
+            np.copyto(term, src[..., channel])
+            np.multiply(term, self.LUMA[channel], out=term)
+            np.add(acc, term, out=acc)
+        np.right_shift(acc, 8, out=acc)
+        np.copyto(out, acc, casting='unsafe')
+
+    def latest(self):
+        return self.frames[-1]
+
+    def clear(self):
+        self.frames[...] = 0
+
+
+class SpriteCache:
+    """Pre-rendered sprites, one converted surface per (class, visual state).
+
+    Classes provide `bake(state)` returning (surface, (ox, oy)); draw() then
+    blits the surface at (x - ox, y - oy) instead of redrawing primitives.
+    """
+    COLORKEY = (255, 0, 255)
+
+    def __init__(self):
+        self.sprites = {}
+        self.baked = 0
+
+    def get(self, cls, state):
+        sprite = self.sprites.get((cls, state))
+        if sprite is None:
+            surf, origin = cls.bake(state)
+            if pygame.display.get_surface() is not None:
+                surf = surf.convert_alpha() if surf.get_flags() & pygame.SRCALPHA else surf.convert()
+            if not surf.get_flags() & pygame.SRCALPHA:
+                surf.set_colorkey(self.COLORKEY, pygame.RLEACCEL)
+            sprite = self.sprites[(cls, state)] = (surf, origin)
+            self.baked += 1
+        return sprite
+
+    def blit(self, screen, cls, state, x, y):
+        surf, (ox, oy) = self.get(cls, state)
+        screen.blit(surf, (x - ox, y - oy))
+
+    def keyed_surface(self, width, height):
+        surf = pygame.Surface((width, height))
+        surf.fill(self.COLORKEY)
+        return surf
+
+    def prebake(self):
+        """Bake every known visual state up front"""
+        for cls in (Player, Dino, Car, Coin, RedCoin, GoldenCoin, MuzzleFlash, Explosion):
+            for state in cls.sprite_states():
+                self.get(cls, state)
+
+
+SPRITES = SpriteCache()
+
 
 class Player:
     def __init__(self, x, y):
@@ -75,7 +1602,7 @@ class Player:
         self.reverse_controls = 0
         self.big_jump_timer = 0
 
-    def update(self, platforms):
+    def update(self, platforms, keys=None, world_width=SCREEN_WIDTH):
 
         if self.speed_boost_timer > 0:
             self.speed_boost_timer -= 1
@@ -86,7 +1613,8 @@ class Player:
         if self.big_jump_timer > 0:
             self.big_jump_timer -= 1
             
-        keys = pygame.key.get_pressed()
+        if keys is None:
+            keys = pygame.key.get_pressed()
         self.vel_x = 0
         
         current_speed = PLAYER_SPEED * 2 if self.speed_boost_timer > 0 else PLAYER_SPEED
@@ -116,14 +1644,18 @@ class Player:
     
         if self.x < 0:
             self.x = 0
-        elif self.x > SCREEN_WIDTH - self.width:
-            self.x = SCREEN_WIDTH - self.width
+        elif self.x > world_width - self.width:
+            self.x = world_width - self.width
             
 
         self.rect.x = self.x
         self.rect.y = self.y
         
 
+        if isinstance(platforms, (SpatialHash, EntityList, EntityArrays)):
+            # Landing/head-bump snaps move the rect by up to 20px.
+            platforms = platforms.query(self.rect.inflate(0, 40))
+
         self.on_ground = False
         for platform in platforms:
             if hasattr(platform, 'visible') and not platform.visible:
@@ -147,7 +1679,7 @@ class Player:
             self.vel_y = 0
             self.on_ground = True
             
-    def draw(self, screen):
+    def draw(self, screen, camera_x=0):
 
         player_color = RED
         if self.invulnerable_timer > 0:
@@ -159,11 +1691,116 @@ class Player:
         elif self.big_jump_timer > 0:
             player_color = LIME
             
-        pygame.draw.rect(screen, player_color, self.rect)
-
-        pygame.draw.rect(screen, player_color, (self.x, self.y - 5, self.width, 10))
-
-        pygame.draw.rect(screen, (255, 220, 177), (self.x + 5, self.y + 5, self.width - 10, 20))
+        SPRITES.blit(screen, Player, player_color, int(self.x) - camera_x, int(self.y))
+
+    @staticmethod
+    def sprite_states():
+        return (RED, WHITE, ORANGE, PURPLE, LIME)
+
+    @staticmethod
+    def bake(player_color):
+        width, height = 40, 50
+        surf = SPRITES.keyed_surface(width, height + 5)
+        pygame.draw.rect(surf, player_color, (0, 5, width, height))
+        pygame.draw.rect(surf, player_color, (0, 0, width, 10))
+        pygame.draw.rect(surf, (255, 220, 177), (5, 10, width - 10, 20))
+        return surf, (0, 5)
+
+    def bounds(self, camera_x=0):
+        """Screen area touched by draw() (body plus the 5px head band)"""
+        area = pygame.Rect(int(self.x) - 1, int(self.y) - 6, self.width + 2, self.height + 7).union(self.rect)
+        return area.move(-camera_x, 0)
+
+
+class PlayerBatch:
+    """N independent players stepped as (N,) arrays, for agent training and level checks.
+
+    step(left, right, jump) takes per-player key states and reproduces
+    Player.update: power-up timers, run speed and jump power, reversed
+    controls, gravity, world clamping, landing on / bumping into the first
+    overlapping visible platform, and the ground floor. Every player sees
+    the same platform rects (re-read by set_platforms); `visible` may be
+    replaced with an (N, M) mask for per-player disappearing platforms.
+    No jump sound is played, and what Game.update does around the player
+    (bounce pads, enemies, pickups) is up to the caller.
+    """
+    TIMERS = ('speed_boost_timer', 'invulnerable_timer', 'reverse_controls', 'big_jump_timer')
+
+    def __init__(self, n, x=50, y=SCREEN_HEIGHT - 200, platforms=(), world_width=SCREEN_WIDTH):
+        self.n = n
+        self.width = 40
+        self.height = 50
+        self.x = np.full(n, x, dtype=np.float64)
+        self.y = np.full(n, y, dtype=np.float64)
+        self.vel_x = np.zeros(n, dtype=np.float64)
+        self.vel_y = np.zeros(n, dtype=np.float64)
+        self.on_ground = np.zeros(n, dtype=bool)
+        for name in self.TIMERS:
+            setattr(self, name, np.zeros(n, dtype=np.int64))
+        self.world_width = world_width
+        self.set_platforms(platforms)
+
+    @classmethod
+    def from_players(cls, players, platforms=(), world_width=SCREEN_WIDTH):
+        """Batch holding a copy of each Player's state"""
+        batch = cls(len(players), platforms=platforms, world_width=world_width)
+        for name in ('x', 'y', 'vel_x', 'vel_y', 'on_ground') + cls.TIMERS:
+            getattr(batch, name)[:] = [getattr(p, name) for p in players]
+        return batch
+
+    def set_platforms(self, platforms):
+        """Take the rects and visibility of `platforms`, in collision order;
+        call again after they move or toggle, as Game.update does before the player"""
+        rects = [p.rect for p in platforms]
+        self.left = np.array([r.left for r in rects], dtype=np.int64)
+        self.top = np.array([r.top for r in rects], dtype=np.int64)
+        self.right = np.array([r.right for r in rects], dtype=np.int64)
+        self.bottom = np.array([r.bottom for r in rects], dtype=np.int64)
+        # Zero-size rects never collide (Rect.colliderect), so they count as hidden.
+        self.solid = (self.right > self.left) & (self.bottom > self.top)
+        self.visible = np.array([getattr(p, 'visible', True) for p in platforms], dtype=bool)
+
+    def step(self, left, right, jump):
+        for name in self.TIMERS:
+            timer = getattr(self, name)
+            timer -= timer > 0
+
+        speed = np.where(self.speed_boost_timer > 0, PLAYER_SPEED * 2, PLAYER_SPEED)
+        speed = np.where(self.reverse_controls > 0, -speed, speed)
+        # Right is checked after left, so it wins when both are held.
+        self.vel_x = vel_x = np.where(right, speed, np.where(left, -speed, 0))
+        jump_power = np.where(self.big_jump_timer > 0, JUMP_STRENGTH * 1.5, JUMP_STRENGTH)
+        vel_y = np.where(jump & self.on_ground, jump_power, self.vel_y) + GRAVITY
+
+        x = np.minimum(np.maximum(self.x + vel_x, 0), self.world_width - self.width)
+        y = self.y + vel_y
+        on_ground = np.zeros(self.n, dtype=bool)
+
+        if len(self.left):
+            rx = rect_coords(x)[:, None]
+            ry = rect_coords(y)[:, None]
+            hit = ((self.visible & self.solid) & (rx < self.right) & (rx + self.width > self.left)
+                   & (ry < self.bottom) & (ry + self.height > self.top))
+            falling = (vel_y > 0)[:, None]
+            rising = (vel_y < 0)[:, None]
+            snap = hit & ((falling & (ry + self.height <= self.top + 20))
+                          | (rising & (ry >= self.bottom - 20)))
+            # Only the first platform can snap: the snap zeroes vel_y, which
+            # disarms both tests for the rest of Player.update's loop.
+            first = snap.argmax(axis=1)
+            snapped = snap[np.arange(self.n), first]
+            landed = snapped & falling[:, 0]
+            y = np.where(landed, self.top[first] - self.height,
+                         np.where(snapped, self.bottom[first], y))
+            vel_y = np.where(snapped, 0.0, vel_y)
+            on_ground = landed
+
+        floor = SCREEN_HEIGHT - 100 - self.height
+        grounded = y >= floor
+        self.y = np.where(grounded, floor, y)
+        self.vel_y = np.where(grounded, 0.0, vel_y)
+        self.on_ground = on_ground | grounded
+        self.x = x
 
 class Platform:
     def __init__(self, x, y, width, height):
@@ -176,9 +1813,10 @@ class Platform:
     def update(self):
         pass
         
-    def draw(self, screen):
-        pygame.draw.rect(screen, BROWN, self.rect)
-        pygame.draw.rect(screen, BLACK, self.rect, 2)
+    def draw(self, screen, camera_x=0):
+        rect = self.rect.move(-camera_x, 0)
+        pygame.draw.rect(screen, BROWN, rect)
+        pygame.draw.rect(screen, BLACK, rect, 2)
 
 class MovingPlatform(Platform):
     def __init__(self, x, y, width, height, start_x, end_x, speed=1):
@@ -194,9 +1832,13 @@ class MovingPlatform(Platform):
             self.direction *= -1
         self.rect.x = self.x
         
-    def draw(self, screen):
-        pygame.draw.rect(screen, BLUE, self.rect)
-        pygame.draw.rect(screen, BLACK, self.rect, 2)
+    def draw(self, screen, camera_x=0):
+        rect = self.rect.move(-camera_x, 0)
+        pygame.draw.rect(screen, BLUE, rect)
+        pygame.draw.rect(screen, BLACK, rect, 2)
+
+    def bounds(self, camera_x=0):
+        return self.rect.move(-camera_x, 0)
 
 class DisappearingPlatform(Platform):
     def __init__(self, x, y, width, height):
@@ -216,19 +1858,21 @@ class DisappearingPlatform(Platform):
         if self.visible:
             self.touch_timer = 60
             
-    def draw(self, screen):
+    def draw(self, screen, camera_x=0):
         if self.visible:
             color = GRAY if self.touch_timer > 0 else BROWN
-            pygame.draw.rect(screen, color, self.rect)
-            pygame.draw.rect(screen, BLACK, self.rect, 2)
+            rect = self.rect.move(-camera_x, 0)
+            pygame.draw.rect(screen, color, rect)
+            pygame.draw.rect(screen, BLACK, rect, 2)
 
 class BouncePlatform(Platform):
     def __init__(self, x, y, width, height):
         super().__init__(x, y, width, height)
         
-    def draw(self, screen):
-        pygame.draw.rect(screen, PINK, self.rect)
-        pygame.draw.rect(screen, BLACK, self.rect, 2)
+    def draw(self, screen, camera_x=0):
+        rect = self.rect.move(-camera_x, 0)
+        pygame.draw.rect(screen, PINK, rect)
+        pygame.draw.rect(screen, BLACK, rect, 2)
 
 class Enemy:
     def __init__(self, x, y, platform_left, platform_right):
@@ -248,10 +1892,14 @@ class Enemy:
             self.direction *= -1
         self.rect.x = self.x
         
-    def draw(self, screen):
-        pygame.draw.rect(screen, GREEN, self.rect)
-        pygame.draw.circle(screen, BLACK, (self.x + 8, self.y + 8), 3)
-        pygame.draw.circle(screen, BLACK, (self.x + 22, self.y + 8), 3)
+    def draw(self, screen, camera_x=0):
+        x = self.x - camera_x
+        pygame.draw.rect(screen, GREEN, self.rect.move(-camera_x, 0))
+        pygame.draw.circle(screen, BLACK, (x + 8, self.y + 8), 3)
+        pygame.draw.circle(screen, BLACK, (x + 22, self.y + 8), 3)
+
+    def bounds(self, camera_x=0):
+        return self.rect.inflate(2, 2).move(-camera_x, 0)
 
 class Coin:
     def __init__(self, x, y):
@@ -261,9 +1909,19 @@ class Coin:
         self.height = 20
         self.rect = pygame.Rect(self.x, self.y, self.width, self.height)
         
-    def draw(self, screen):
-        pygame.draw.circle(screen, YELLOW, (self.x + 10, self.y + 10), 10)
-        pygame.draw.circle(screen, BLACK, (self.x + 10, self.y + 10), 10, 2)
+    def draw(self, screen, camera_x=0):
+        SPRITES.blit(screen, Coin, None, int(self.x) - camera_x + 10, int(self.y) + 10)
+
+    @staticmethod
+    def sprite_states():
+        return (None,)
+
+    @staticmethod
+    def bake(state):
+        surf = SPRITES.keyed_surface(22, 22)
+        pygame.draw.circle(surf, YELLOW, (11, 11), 10)
+        pygame.draw.circle(surf, BLACK, (11, 11), 10, 2)
+        return surf, (11, 11)
 
 class RedCoin:
     def __init__(self, x, y):
@@ -277,11 +1935,25 @@ class RedCoin:
     def update(self):
         self.glow_timer += 1
         
-    def draw(self, screen):
+    def draw(self, screen, camera_x=0):
         glow_size = 12 + int(3 * math.sin(self.glow_timer * 0.2))
-        pygame.draw.circle(screen, RED, (self.x + 12, self.y + 12), glow_size)
-        pygame.draw.circle(screen, DARK_RED, (self.x + 12, self.y + 12), glow_size, 3)
-        pygame.draw.circle(screen, WHITE, (self.x + 12, self.y + 12), 4)
+        SPRITES.blit(screen, RedCoin, glow_size, int(self.x - camera_x) + 12, int(self.y) + 12)
+
+    @staticmethod
+    def sprite_states():
+        return range(9, 16)
+
+    @staticmethod
+    def bake(glow_size):
+        surf = SPRITES.keyed_surface(34, 34)
+        pygame.draw.circle(surf, RED, (17, 17), glow_size)
+        pygame.draw.circle(surf, DARK_RED, (17, 17), glow_size, 3)
+        pygame.draw.circle(surf, WHITE, (17, 17), 4)
+        return surf, (17, 17)
+
+    def bounds(self, camera_x=0):
+        """Largest glow circle (radius 15) around the coin centre"""
+        return pygame.Rect(int(self.x - camera_x) - 4, int(self.y) - 4, 33, 33)
 
 
 class GoldenCoin:
@@ -300,9 +1972,19 @@ class GoldenCoin:
         draw_x = int(self.x - camera_x)
         draw_y = int(self.y)
         size = 12 + int(2 * math.sin(self.pulse * 0.2))
-        pygame.draw.circle(screen, (255, 215, 0), (draw_x + 13, draw_y + 13), size)
-        pygame.draw.circle(screen, (200, 160, 0), (draw_x + 13, draw_y + 13), size, 2)
-        pygame.draw.circle(screen, WHITE, (draw_x + 13, draw_y + 13), 4)
+        SPRITES.blit(screen, GoldenCoin, size, draw_x + 13, draw_y + 13)
+
+    @staticmethod
+    def sprite_states():
+        return range(10, 15)
+
+    @staticmethod
+    def bake(size):
+        surf = SPRITES.keyed_surface(30, 30)
+        pygame.draw.circle(surf, (255, 215, 0), (15, 15), size)
+        pygame.draw.circle(surf, (200, 160, 0), (15, 15), size, 2)
+        pygame.draw.circle(surf, WHITE, (15, 15), 4)
+        return surf, (15, 15)
 
 class PowerUp:
     def __init__(self, x, y, power_type):
@@ -313,15 +1995,16 @@ class PowerUp:
         self.rect = pygame.Rect(self.x, self.y, self.width, self.height)
         self.type = power_type
         
-    def draw(self, screen):
+    def draw(self, screen, camera_x=0):
         colors = {
             'speed': ORANGE,
             'jump': LIME,
             'invulnerable': WHITE,
             'reverse': PURPLE
         }
-        pygame.draw.rect(screen, colors[self.type], self.rect)
-        pygame.draw.rect(screen, BLACK, self.rect, 2)
+        rect = self.rect.move(-camera_x, 0)
+        pygame.draw.rect(screen, colors[self.type], rect)
+        pygame.draw.rect(screen, BLACK, rect, 2)
 
 
 class Dino:
@@ -363,56 +2046,179 @@ class Dino:
             self.on_ground = False
 
     def draw(self, screen):
+        SPRITES.blit(screen, Dino, self.run_anim, int(self.x), int(self.y))
+
+    @staticmethod
+    def sprite_states():
+        return (0, 1)
+
+    @staticmethod
+    def bake(run_anim):
+        pad = 2
+        surf = SPRITES.keyed_surface(40 + 2 * pad, 40 + 2 * pad)
+        x = y = pad
 
         head_radius = 6
-        head_x = int(self.x + self.width * 0.75)
-        head_y = int(self.y + 8)
+        head_x = int(x + 40 * 0.75)
+        head_y = int(y + 8)
 
-        torso_rect = pygame.Rect(int(self.x + 8), int(self.y + 8), 12, 20)
-        pygame.draw.rect(screen, (200, 30, 30), torso_rect)
+        torso_rect = pygame.Rect(x + 8, y + 8, 12, 20)
+        pygame.draw.rect(surf, (200, 30, 30), torso_rect)
 
-        pygame.draw.circle(screen, (255, 220, 177), (head_x, head_y), head_radius)
+        pygame.draw.circle(surf, (255, 220, 177), (head_x, head_y), head_radius)
 
-        if self.run_anim == 0:
+        if run_anim == 0:
 
-            pygame.draw.line(screen, BLACK, (int(self.x + 12), int(self.y + 28)), (int(self.x + 6), int(self.y + 38)), 3)
-            pygame.draw.line(screen, BLACK, (int(self.x + 20), int(self.y + 28)), (int(self.x + 26), int(self.y + 38)), 3)
+            pygame.draw.line(surf, BLACK, (x + 12, y + 28), (x + 6, y + 38), 3)
+            pygame.draw.line(surf, BLACK, (x + 20, y + 28), (x + 26, y + 38), 3)
 
-            pygame.draw.line(screen, BLACK, (int(self.x + 14), int(self.y + 14)), (int(self.x + 4), int(self.y + 20)), 3)
-            pygame.draw.line(screen, BLACK, (int(self.x + 20), int(self.y + 14)), (int(self.x + 30), int(self.y + 10)), 3)
+            pygame.draw.line(surf, BLACK, (x + 14, y + 14), (x + 4, y + 20), 3)
+            pygame.draw.line(surf, BLACK, (x + 20, y + 14), (x + 30, y + 10), 3)
         else:
 
-            pygame.draw.line(screen, BLACK, (int(self.x + 12), int(self.y + 28)), (int(self.x + 6), int(self.y + 18)), 3)
-            pygame.draw.line(screen, BLACK, (int(self.x + 20), int(self.y + 28)), (int(self.x + 26), int(self.y + 18)), 3)
+            pygame.draw.line(surf, BLACK, (x + 12, y + 28), (x + 6, y + 18), 3)
+            pygame.draw.line(surf, BLACK, (x + 20, y + 28), (x + 26, y + 18), 3)
 
-            pygame.draw.line(screen, BLACK, (int(self.x + 14), int(self.y + 14)), (int(self.x + 4), int(self.y + 10)), 3)
-            pygame.draw.line(screen, BLACK, (int(self.x + 20), int(self.y + 14)), (int(self.x + 30), int(self.y + 20)), 3)
+            pygame.draw.line(surf, BLACK, (x + 14, y + 14), (x + 4, y + 10), 3)
+            pygame.draw.line(surf, BLACK, (x + 20, y + 14), (x + 30, y + 20), 3)
+        return surf, (pad, pad)
 
 
 class Cactus:
-    def __init__(self, x):
-        self.x = x
+    """A cactus at a fixed track position; the runner scrolls past it"""
+    def __init__(self, x, width, height):
         self.y = SCREEN_HEIGHT - 50
-        self.width = random.choice([20, 25, 30])
-
-        self.height = random.choice([40, 48, 56])
-        self.rect = pygame.Rect(self.x, self.y - self.height + 10, self.width, self.height)
-
-    def update(self, speed):
-        self.x -= speed
-        self.rect.x = self.x
-
-    def draw(self, screen):
-        pygame.draw.rect(screen, GREEN, self.rect)
-
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.reset(x, width, height)
 
-def dinosaur_game_over(screen, score, game=None):
-    
-    font = pygame.font.Font(None, 48)
-    small_font = pygame.font.Font(None, 28)
-
-
-    title = font.render("GAME OVER", True, (200, 0, 0))
+    def reset(self, x, width, height):
+        self.x = x
+        self.width = width
+        self.height = height
+        self.rect.update(int(x), self.y - height + 10, width, height)
+
+    def draw(self, screen, offset=0):
+        pygame.draw.rect(screen, GREEN, self.rect.move(-int(offset), 0))
+
+
+class ObstacleRing:
+    """Fixed-capacity FIFO of obstacles, front-most (oldest) first.
+
+    Obstacles join at the back as they are scheduled and leave from the
+    front once they scroll off, so both ends are O(1) and nothing is copied
+    or shifted per step. Slots keep their objects and recycle them through
+    reset(), like EntityPool.
+    """
+    def __init__(self, cls, capacity):
+        self.cls = cls
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.head = 0
+        self.count = 0
+        self.high_water = 0
+        self.spawned = 0
+        self.recycled = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self.slots[(self.head + index) % self.capacity]
+
+    def __iter__(self):
+        slots, capacity, head = self.slots, self.capacity, self.head
+        for i in range(self.count):
+            yield slots[(head + i) % capacity]
+
+    def push(self, *args):
+        if self.count >= self.capacity:
+            self.dropped += 1
+            return None
+        index = (self.head + self.count) % self.capacity
+        obj = self.slots[index]
+        if obj is None:
+            obj = self.slots[index] = self.cls(*args)
+        else:
+            obj.reset(*args)
+            self.recycled += 1
+        self.count += 1
+        self.spawned += 1
+        if self.count > self.high_water:
+            self.high_water = self.count
+        return obj
+
+    def front(self):
+        return self.slots[self.head] if self.count else None
+
+    def pop(self):
+        """Drop the front-most obstacle (its slot is reused by a later push)"""
+        obj = self.slots[self.head]
+        self.head = (self.head + 1) % self.capacity
+        self.count -= 1
+        return obj
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def stats(self):
+        return {'active': self.count, 'high_water': self.high_water,
+                'capacity': self.capacity, 'spawned': self.spawned,
+                'recycled': self.recycled, 'dropped': self.dropped}
+
+
+class SpawnSchedule:
+    """Seeded dino obstacle schedule, precomputed `batch` entries at a time.
+
+    Entry i is (gap, width, height, speed): the track distance from
+    obstacle i-1, the cactus size, and the run speed once it is queued.
+    Speed ramps by `ramp` per obstacle up to `max_speed`, and gaps are drawn
+    in frames of travel at that speed so they stay jumpable however fast
+    the run gets. The whole schedule depends only on the seed.
+    """
+    WIDTHS = (20, 25, 30)
+    HEIGHTS = (40, 48, 56)
+
+    def __init__(self, seed=0, speed=6.0, ramp=0.02, max_speed=20.0, gap_frames=(75, 125), batch=256):
+        self.rng = np.random.default_rng(seed)
+        self.speed = speed
+        self.ramp = ramp
+        self.max_speed = max_speed
+        self.gap_frames = gap_frames
+        self.batch = batch
+        self.index = 0
+        self.entries = []
+        self.cursor = 0
+
+    def _fill(self):
+        rng = self.rng
+        n = np.arange(self.index, self.index + self.batch)
+        speeds = np.minimum(self.speed + self.ramp * n, self.max_speed)
+        gaps = speeds * rng.uniform(self.gap_frames[0], self.gap_frames[1], self.batch)
+        widths = rng.choice(self.WIDTHS, self.batch)
+        heights = rng.choice(self.HEIGHTS, self.batch)
+        self.entries = list(zip(gaps.tolist(), widths.tolist(), heights.tolist(), speeds.tolist()))
+        self.cursor = 0
+        self.index += self.batch
+
+    def next(self):
+        if self.cursor >= len(self.entries):
+            self._fill()
+        entry = self.entries[self.cursor]
+        self.cursor += 1
+        return entry
+
+
+def dino_game_over_popup(score, game=None, popup=None):
+    """Draw the dino game-over panel into `popup` (allocated if None); returns (popup, topleft)"""
+    font = TEXT_CACHE.font(48)
+    small_font = TEXT_CACHE.font(28)
+
+
+    title = TEXT_CACHE.render(font, "GAME OVER", (200, 0, 0))
     score_line = small_font.render(f"Jump Score: {score}", True, (0, 0, 0))
     if game is not None:
         total_line = small_font.render(f"Total Score: {game.Total_score}", True, (0, 0, 0))
@@ -421,11 +2227,12 @@ def dinosaur_game_over(screen, score, game=None):
         total_line = None
         top_line = None
 
-    prompt = small_font.render("Press R to play again or ESC to exit", True, (10, 10, 10))
+    prompt = TEXT_CACHE.render(small_font, "Press R to play again or ESC to exit", (10, 10, 10))
 
 
     popup_w, popup_h = 560, 220
-    popup = pygame.Surface((popup_w, popup_h), pygame.SRCALPHA)
+    if popup is None:
+        popup = pygame.Surface((popup_w, popup_h), pygame.SRCALPHA)
     popup.fill((240, 240, 240, 230))
     pygame.draw.rect(popup, (0, 0, 0), popup.get_rect(), 2)
 
@@ -441,133 +2248,444 @@ def dinosaur_game_over(screen, score, game=None):
 
     popup_x = SCREEN_WIDTH//2 - popup_w//2
     popup_y = SCREEN_HEIGHT//2 - popup_h//2
-    screen.blit(popup, (popup_x, popup_y))
-    pygame.display.flip()
-
-    waiting = True
-    choice = 'quit'
-    while waiting:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                waiting = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r:
-
-                    if game is not None:
-                        try:
-                            game.request_restart_to_platformer = True
-                        except Exception:
-                            pass
-                    print('[dinosaur_game_over] R pressed: requesting restart')
-                    choice = 'restart'
-                    waiting = False
-                elif event.key == pygame.K_ESCAPE:
-                    waiting = False
-
-
-    print(f'[dinosaur_game_over] returning choice={choice}')
-    return choice
-
-
-def dinosaur_main(game=None):
-   
-    
-    standalone = game is None
-    if standalone:
-        pygame.init()
-        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Dinosaur Runner")
-        clock = pygame.time.Clock()
-    else:
-
-        screen = game.screen
-        clock = game.clock
-
-    dino = Dino()
-    cactuses = []
-    spawn_timer = 0
-    speed = 6
-    score = 0
-    font = pygame.font.Font(None, 28)
-
-    running = True
-    prev_score = 0
-    while running:
-        for event in pygame.event.get():
+    return popup, (popup_x, popup_y)
+
+
+class DinoRunner:
+    """State and fixed-step logic for one dinosaur run.
+
+    Cactuses sit at fixed track positions and the runner advances
+    `distance` instead of moving each one, so a step costs the same however
+    many are queued: the ring is topped up from the spawn schedule, passed
+    cactuses leave from the front, and only the front-most ones near the
+    dino are collision-tested.
+    """
+    def __init__(self, game=None, schedule=None, capacity=DINO_OBSTACLES, rng=None):
+        self.game = game
+        if rng is None:
+            rng = game.rng if game is not None else random
+        self.rng = rng
+        self.dino = Dino()
+        if schedule is None:
+            schedule = SpawnSchedule(self.rng.getrandbits(32))
+        self.schedule = schedule
+        self.obstacles = ObstacleRing(Cactus, capacity)
+        self.speed = schedule.speed
+        self.distance = 0.0
+        self.prev_distance = 0.0
+        self.pending = schedule.next()
+        self.next_x = SCREEN_WIDTH + self.pending[0]
+        self.score = 0
+        self.prev_score = 0
+        self.running = True
+        self.crashed = False
+        self.steps = 0
+        self.score_field = HudField(28, "Score: {}")
+        self.total_field = HudField(28, "Total: {}")
+        self.high_field = HudField(28, "Top: {}")
+
+    def spawn(self):
+        """Queue scheduled cactuses up to DINO_SPAWN_AHEAD past the right edge"""
+        obstacles = self.obstacles
+        horizon = self.distance + SCREEN_WIDTH + DINO_SPAWN_AHEAD
+        while self.next_x < horizon and len(obstacles) < obstacles.capacity:
+            _, width, height, self.speed = self.pending
+            obstacles.push(self.next_x, width, height)
+            self.pending = self.schedule.next()
+            self.next_x += self.pending[0]
+
+    def step(self, events):
+        # Runners are also driven without a Game (DinoEnv, bench), so each
+        # step opens its own mixer frame; inside a Game this repeats sim_step's.
+        CHANNELS.begin_frame()
+        capture_positions([self.dino], self.steps)
+        self.steps += 1
+        self.prev_distance = self.distance
+        dino = self.dino
+        for event in events:
             if event.type == pygame.QUIT:
-                running = False
+                self.running = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE or event.key == pygame.K_UP:
                     dino.jump()
                     play_sound(DINO_JUMP_SOUND)
                 elif event.key == pygame.K_ESCAPE:
-                    running = False
+                    self.running = False
 
 
         dino.update()
-        spawn_timer += 1
-        if spawn_timer > 90:
-            spawn_timer = 0
-            cactuses.append(Cactus(SCREEN_WIDTH + random.randint(10, 200)))
-
-        for c in cactuses[:]:
-            c.update(speed)
-            if c.x + c.width < 0:
-                cactuses.remove(c)
-                score += 10
-
-                if game is not None:
-                    try:
-                        delta = int(score - prev_score)
-                        if delta > 0:
-                            game.Total_score += delta
-                            prev_score = score
-
-                            if game.Total_score > getattr(game, 'high_score', 0):
-                                game.high_score = int(game.Total_score)
-                                try:
-                                    with open(game.highscore_path, 'w') as f:
-                                        f.write(str(game.high_score))
-                                except Exception:
-                                    pass
-                    except Exception:
-                        pass
-
-
-        for c in cactuses:
-            if dino.rect.colliderect(c.rect):
-
-                result = dinosaur_game_over(screen, score, game)
-
-                return (score, True if result == 'restart' else False)
-
-
-        screen.fill((135, 206, 235))
-        pygame.draw.rect(screen, BROWN, (0, SCREEN_HEIGHT - 60, SCREEN_WIDTH, 60))
-        dino.draw(screen)
-        for c in cactuses:
-            c.draw(screen)
-
-        score_text = font.render(f"Score: {score}", True, BLACK)
+        self.distance += self.speed
+        self.spawn()
+
+        game = self.game
+        obstacles = self.obstacles
+        while obstacles.count:
+            c = obstacles.front()
+            if c.x + c.width >= self.distance:
+                break
+            obstacles.pop()
+            self.score += 10
+
+            if game is not None:
+                try:
+                    delta = int(self.score - self.prev_score)
+                    if delta > 0:
+                        game.Total_score += delta
+                        self.prev_score = self.score
+
+                        if game.Total_score > getattr(game, 'high_score', 0):
+                            game.high_score = int(game.Total_score)
+                            game.high_score_store.submit(game.high_score)
+                except Exception:
+                    pass
+
+        # Cactuses are in track order, so stop at the first one past the dino.
+        hit = dino.rect.move(int(self.distance), 0)
+        for c in obstacles:
+            if c.rect.left >= hit.right:
+                break
+            if hit.colliderect(c.rect):
+                self.crashed = True
+                break
+
+    def draw(self, screen, alpha=1.0):
+        saved = lerp_positions([self.dino], self.steps - 1, alpha)
+        offset = self.prev_distance + (self.distance - self.prev_distance) * alpha
+        try:
+            screen.fill((135, 206, 235))
+            pygame.draw.rect(screen, BROWN, (0, SCREEN_HEIGHT - 60, SCREEN_WIDTH, 60))
+            self.dino.draw(screen)
+            right = offset + SCREEN_WIDTH
+            for c in self.obstacles:
+                if c.x >= right:
+                    break
+                c.draw(screen, offset)
+        finally:
+            restore_positions(saved)
+
+        score_text = self.score_field.surface(self.score)
         screen.blit(score_text, (10, 10))
 
+        game = self.game
         if game is not None:
-            Total_disp = font.render(f"Total: {game.Total_score}", True, BLACK)
-            high_disp = font.render(f"Top: {game.high_score}", True, BLACK)
+            Total_disp = self.total_field.surface(game.Total_score)
+            high_disp = self.high_field.surface(game.high_score)
             screen.blit(Total_disp, (10, 40))
             high_x = SCREEN_WIDTH // 2 - high_disp.get_width() // 2
             screen.blit(high_disp, (high_x, 10))
 
-        pygame.display.flip()
-        clock.tick(FPS)
 
-    if standalone:
-        pygame.quit()
-        return (score, False)
-    else:
-        
-        return (score, False)
+class Scene(ABC):
+    """One screen on Game.scenes; only the top scene steps and draws.
+
+    Scenes share the Game's display, mixer, clock, fonts and sprite cache,
+    so switching is a list operation plus enter()/exit(): nothing is
+    re-initialised. `caption` (None keeps the current one) is applied when
+    the scene comes to the top. An `idle` scene only waits on input, so
+    Game.run sleeps on the event queue instead of ticking at full rate.
+    """
+    name = 'scene'
+    caption = None
+    idle = False
+
+    def __init__(self, game):
+        self.game = game
+
+    def enter(self):
+        pass
+
+    def exit(self):
+        pass
+
+    def resume(self):
+        """Back on top after the scene above it was popped"""
+
+    @abstractmethod
+    def sim_step(self):
+        pass
+
+    @abstractmethod
+    def draw(self, alpha=1.0):
+        """Render into game.screen; returns dirty rects, or None for a full flip"""
+
+
+class PlayScene(Scene):
+    """Platformer or hill-climb: the Game's own simulation and renderer"""
+    caption = "🔥 DevilCoder - Kuldeep singh 🔥"
+
+    def __init__(self, game, name):
+        super().__init__(game)
+        self.name = name
+
+    def enter(self):
+        self.game.compositor.invalidate()
+
+    def resume(self):
+        # Whatever was above drew over the whole screen.
+        self.game.compositor.invalidate()
+
+    def sim_step(self):
+        game = self.game
+        game.play_step()
+        if game.lives <= 0 and game.scenes.top() is self:
+            game.scenes.push(game.game_over_scene)
+
+    def draw(self, alpha=1.0):
+        return self.game.draw_play(alpha)
+
+
+class DinoScene(Scene):
+    """The golden-coin dinosaur round, stepped by the main loop like any other scene"""
+    name = 'dino'
+    caption = "Dinosaur Runner"
+
+    def __init__(self, game):
+        super().__init__(game)
+        self.runner = None
+        self.game_over = DinoGameOverScene(game, self)
+
+    def enter(self):
+        self.game.high_score_store.flush()
+        self.runner = DinoRunner(self.game)
+
+    def sim_step(self):
+        game = self.game
+        profiler = game.profiler
+        t = profiler.start()
+        events = game.input.get_events()
+        self.runner.step(events)
+        profiler.stop('dino_step', t)
+        if self.runner.crashed:
+            game.scenes.push(self.game_over)
+        elif not self.runner.running:
+            self.finish(False)
+        elif any(e.type == pygame.KEYDOWN and e.key == pygame.K_PAUSE for e in events):
+            # ESC already ends the round here, so only the Pause key pauses it.
+            game.scenes.push(game.pause_scene)
+
+    def finish(self, restart):
+        self.game.scenes.pop()
+        self.game.end_dino_round(self.runner.score, restart)
+
+    def draw(self, alpha=1.0):
+        profiler = self.game.profiler
+        t = profiler.start()
+        self.runner.draw(self.game.screen, alpha)
+        profiler.stop('dino_draw', t)
+        return None
+
+
+class IdleScene(Scene):
+    """A scene that waits on input over a frozen scene: game over, pause.
+
+    Nothing changes between key presses, so the frame is drawn once when the
+    scene comes up (again after an expose) and later draws present nothing.
+    """
+    idle = True
 
+    def __init__(self, game):
+        super().__init__(game)
+        self.stale = True
+
+    def enter(self):
+        self.stale = True
+
+    def resume(self):
+        self.stale = True
+
+    def poll(self):
+        """This step's events; an expose only marks the frame for redrawing"""
+        events = []
+        for event in self.game.input.get_events():
+            if event.type == pygame.VIDEOEXPOSE:
+                self.stale = True
+            else:
+                events.append(event)
+        return events
+
+    def draw(self, alpha=1.0):
+        if not self.stale:
+            return []
+        self.stale = False
+        self.render()
+        return None
+
+    @abstractmethod
+    def render(self):
+        pass
+
+
+class GameOverScene(IdleScene):
+    """Out of lives: the play scene stays frozen under its GAME OVER text until R"""
+    name = 'game_over'
+
+    def sim_step(self):
+        game = self.game
+        for event in self.poll():
+            if event.type == pygame.QUIT:
+                game.running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_r:
+                game.restart(game.rng.getrandbits(63))
+                # The R step also runs the new session's first tick, as it did before.
+                game.update()
+                return
+
+    def render(self):
+        self.game.compositor.invalidate()
+        self.game.scenes.base().draw(1.0)
+
+
+class PauseScene(IdleScene):
+    """ESC or Pause freezes the scene below; the same keys resume it"""
+    name = 'paused'
+    keys = (pygame.K_ESCAPE, pygame.K_PAUSE)
+
+    def __init__(self, game):
+        super().__init__(game)
+        self.shade = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        self.shade.fill((0, 0, 0, 120))
+        TEXT_CACHE.font(48)
+
+    def sim_step(self):
+        game = self.game
+        for event in self.poll():
+            if event.type == pygame.QUIT:
+                game.running = False
+            elif event.type == pygame.KEYDOWN and event.key in self.keys:
+                game.scenes.pop()
+                return
+
+    def render(self):
+        game = self.game
+        game.compositor.invalidate()
+        game.scenes.scenes[-2].draw(1.0)
+        game.screen.blit(self.shade, (0, 0))
+        title = TEXT_CACHE.render(TEXT_CACHE.font(48), "PAUSED", WHITE)
+        game.screen.blit(title, title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20)))
+        hint = TEXT_CACHE.render(game.font, "Press ESC to resume", WHITE)
+        game.screen.blit(hint, hint.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 30)))
+
+
+class DinoGameOverScene(IdleScene):
+    """Popup over the crashed dino round: R starts over from the platformer, ESC returns to hill-climb"""
+    name = 'dino_game_over'
+
+    def __init__(self, game, dino):
+        super().__init__(game)
+        self.dino = dino
+        self.popup = None
+        self.pos = (0, 0)
+        TEXT_CACHE.font(48)
+        TEXT_CACHE.font(28)
+
+    def enter(self):
+        super().enter()
+        self.popup, self.pos = dino_game_over_popup(self.dino.runner.score, self.game, self.popup)
+
+    def sim_step(self):
+        game = self.game
+        choice = None
+        for event in self.poll():
+            if event.type == pygame.QUIT:
+                choice = choice or 'quit'
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_r:
+                    choice = 'restart'
+                elif event.key == pygame.K_ESCAPE:
+                    choice = choice or 'quit'
+        if choice is None and not game.input.waits_for_input:
+            # Scripted/replayed input never waits: take whatever was queued.
+            choice = 'quit'
+        if choice is not None:
+            game.scenes.pop()
+            self.dino.finish(choice == 'restart')
+
+    def render(self):
+        self.dino.draw(1.0)
+        self.game.screen.blit(self.popup, self.pos)
+
+
+class SceneStack:
+    """Game.scenes: a play scene at the bottom, dino round and popups pushed over it.
+
+    push()/pop() change the top scene and switch() replaces the bottom play
+    scene (platformer <-> hill-climb). Each change of top scene is timed
+    until the next frame is presented, per (from, to) pair, in stats().
+    """
+    def __init__(self):
+        self.scenes = []
+        self.caption = None
+        self.pending = None
+        self.latency = {}
+
+    def __len__(self):
+        return len(self.scenes)
+
+    def top(self):
+        return self.scenes[-1]
+
+    def base(self):
+        return self.scenes[0]
+
+    def push(self, scene):
+        previous = self.scenes[-1] if self.scenes else None
+        self.scenes.append(scene)
+        scene.enter()
+        self._changed(previous)
+
+    def pop(self):
+        scene = self.scenes.pop()
+        scene.exit()
+        self.scenes[-1].resume()
+        self._changed(scene)
+        return scene
+
+    def unwind(self):
+        """Pop everything above the play scene"""
+        while len(self.scenes) > 1:
+            self.pop()
+
+    def switch(self, scene):
+        if not self.scenes:
+            self.push(scene)
+            return
+        previous = self.scenes[0]
+        if previous is scene:
+            return
+        previous.exit()
+        self.scenes[0] = scene
+        scene.enter()
+        if len(self.scenes) == 1:
+            self._changed(previous)
+
+    def _changed(self, previous):
+        top = self.scenes[-1]
+        if top.caption is not None and top.caption != self.caption:
+            pygame.display.set_caption(top.caption)
+            self.caption = top.caption
+        if previous is None:
+            return
+        if self.pending is None:
+            self.pending = (previous.name, top.name, time.perf_counter())
+        else:
+            # Several changes before one frame (pop, pop, switch) count as one switch.
+            self.pending = (self.pending[0], top.name, self.pending[2])
+
+    def presented(self):
+        """Call once a frame is on screen: closes the timing of a pending switch"""
+        if self.pending is None:
+            return
+        source, target, start = self.pending
+        self.pending = None
+        elapsed = time.perf_counter() - start
+        entry = self.latency.setdefault((source, target), [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+
+    def stats(self):
+        return {f'{a}->{b}': {'count': n, 'mean_ms': round(total / n * 1000, 3), 'max_ms': round(worst * 1000, 3)}
+                for (a, b), (n, total, worst) in self.latency.items()}
 
 
 class Car:
@@ -583,9 +2701,11 @@ class Car:
         self.rect = pygame.Rect(self.x, self.y, self.width, self.height)
         self.engine_sound_timer = 0
         self.camera_x = 0
+        self.slope = 0.0
         
-    def update(self):
-        keys = pygame.key.get_pressed()
+    def update(self, keys=None, terrain=None):
+        if keys is None:
+            keys = pygame.key.get_pressed()
         
         if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
             self.vel_x += 0.5
@@ -619,10 +2739,17 @@ class Car:
             self.vel_x = 0
             
 
-        road_y = SCREEN_HEIGHT - 150
+        center_x = self.x + self.width / 2
+        road_y = terrain.height(center_x) if terrain is not None else ROAD_Y
         if self.y >= road_y - self.height:
             self.y = road_y - self.height
             self.vel_y = 0
+            if terrain is not None:
+                # Downhill (positive dy/dx) pulls the car forward, uphill holds it back.
+                self.slope = terrain.slope(center_x)
+                self.vel_x += self.slope * 0.25
+        else:
+            self.slope *= 0.9
             
         if self.vel_x > 0:
             self.distance += abs(self.vel_x) * 0.1
@@ -631,48 +2758,72 @@ class Car:
         self.rect.y = self.y
         
     def draw(self, screen, camera_x=0):
-
-        draw_x = self.x - camera_x
-        draw_y = self.y
-        
-
-        car_rect = pygame.Rect(draw_x, draw_y, self.width, self.height)
-        pygame.draw.rect(screen, RED, car_rect)
-        pygame.draw.rect(screen, BLACK, car_rect, 2)
+        # Tilt in 4 degree steps; the sprite pivots on the body centre.
+        angle = max(-32, min(32, int(round(-math.degrees(math.atan(self.slope)) / 4)) * 4))
+        SPRITES.blit(screen, Car, (abs(self.vel_x) > 4, angle),
+                     int(self.x - camera_x) + self.width // 2, int(self.y) + self.height // 2)
+
+    @staticmethod
+    def sprite_states():
+        return [(lines, angle) for lines in (False, True) for angle in range(-32, 33, 4)]
+
+    @staticmethod
+    def bake(state):
+        speed_lines, angle = state
+        ox, oy = 44, 2
+        width, height = 60, 30
+        surf = SPRITES.keyed_surface(ox + width + 2, oy + height + 10)
+
+        car_rect = pygame.Rect(ox, oy, width, height)
+        pygame.draw.rect(surf, RED, car_rect)
+        pygame.draw.rect(surf, BLACK, car_rect, 2)
         
 
-        wheel1_pos = (int(draw_x + 15), int(draw_y + self.height))
-        wheel2_pos = (int(draw_x + 45), int(draw_y + self.height))
+        wheel1_pos = (ox + 15, oy + height)
+        wheel2_pos = (ox + 45, oy + height)
         
-        pygame.draw.circle(screen, BLACK, wheel1_pos, 8)
-        pygame.draw.circle(screen, BLACK, wheel2_pos, 8)
-        pygame.draw.circle(screen, GRAY, wheel1_pos, 6)
-        pygame.draw.circle(screen, GRAY, wheel2_pos, 6)
+        pygame.draw.circle(surf, BLACK, wheel1_pos, 8)
+        pygame.draw.circle(surf, BLACK, wheel2_pos, 8)
+        pygame.draw.circle(surf, GRAY, wheel1_pos, 6)
+        pygame.draw.circle(surf, GRAY, wheel2_pos, 6)
         
 
-        pygame.draw.circle(screen, (255, 220, 177), (int(draw_x + 30), int(draw_y + 10)), 8)
+        pygame.draw.circle(surf, (255, 220, 177), (ox + 30, oy + 10), 8)
         
 
-        if abs(self.vel_x) > 4:
+        if speed_lines:
             for i in range(3):
-                line_x = draw_x - 20 - i * 8
-                line_y = draw_y + 10 + i * 5
-                if line_x > -30:
-                    pygame.draw.line(screen, WHITE, (line_x, line_y), (line_x - 6, line_y), 2)
+                line_x = ox - 20 - i * 8
+                line_y = oy + 10 + i * 5
+                pygame.draw.line(surf, WHITE, (line_x, line_y), (line_x - 6, line_y), 2)
+        pivot = pygame.math.Vector2(ox + width // 2, oy + height // 2)
+        if angle == 0:
+            return surf, (int(pivot.x), int(pivot.y))
+        offset = (pivot - pygame.math.Vector2(surf.get_size()) / 2).rotate(-angle)
+        surf = pygame.transform.rotate(surf, angle)
+        pivot = pygame.math.Vector2(surf.get_size()) / 2 + offset
+        return surf, (int(round(pivot.x)), int(round(pivot.y)))
 
 class ObstacleCar:
     """Simple obstacle car that moves left in world coordinates."""
     def __init__(self, x, y, speed):
-        self.x = x
-        self.y = y
         self.width = 60
         self.height = 30
+        self.rect = pygame.Rect(0, 0, self.width, self.height)
+        self.reset(x, y, speed)
+
+    def reset(self, x, y, speed):
+        self.x = x
+        self.y = y
         self.speed = speed
-        self.rect = pygame.Rect(int(self.x), int(self.y), self.width, self.height)
+        self.rect.x = int(self.x)
+        self.rect.y = int(self.y)
 
-    def update(self):
+    def update(self, terrain=None):
 
         self.x -= self.speed
+        if terrain is not None:
+            self.y = terrain.height(self.x + self.width / 2) - self.height
         self.rect.x = int(self.x)
         self.rect.y = int(self.y)
 
@@ -686,12 +2837,17 @@ class ObstacleCar:
 class Bullet:
 
     def __init__(self, x, y, speed=12):
-        self.x = x
-        self.y = y
         self.width = 8
         self.height = 4
+        self.rect = pygame.Rect(0, 0, self.width, self.height)
+        self.reset(x, y, speed)
+
+    def reset(self, x, y, speed=12):
+        self.x = x
+        self.y = y
         self.speed = speed
-        self.rect = pygame.Rect(int(self.x), int(self.y), self.width, self.height)
+        self.rect.x = int(self.x)
+        self.rect.y = int(self.y)
 
     def update(self):
         self.x += self.speed
@@ -706,6 +2862,9 @@ class Bullet:
 
 class MuzzleFlash:
     def __init__(self, x, y, lifetime=6):
+        self.reset(x, y, lifetime)
+
+    def reset(self, x, y, lifetime=6):
         self.x = x
         self.y = y
         self.timer = 0
@@ -718,11 +2877,25 @@ class MuzzleFlash:
         draw_x = int(self.x - camera_x)
         draw_y = int(self.y)
         size = 6 + (self.lifetime - self.timer)
-        pygame.draw.circle(screen, (255, 220, 100), (draw_x, draw_y), size)
+        if size > 0:
+            SPRITES.blit(screen, MuzzleFlash, size, draw_x, draw_y)
+
+    @staticmethod
+    def sprite_states():
+        return range(1, 13)
+
+    @staticmethod
+    def bake(size):
+        surf = SPRITES.keyed_surface(2 * size + 2, 2 * size + 2)
+        pygame.draw.circle(surf, (255, 220, 100), (size + 1, size + 1), size)
+        return surf, (size + 1, size + 1)
 
 
 class Explosion:
     def __init__(self, x, y, max_time=18):
+        self.reset(x, y, max_time)
+
+    def reset(self, x, y, max_time=18):
         self.x = x
         self.y = y
         self.timer = 0
@@ -732,154 +2905,710 @@ class Explosion:
         self.timer += 1
 
     def draw(self, screen, camera_x=0):
-        progress = self.timer / max(1, self.max_time)
+        SPRITES.blit(screen, Explosion, (self.timer, self.max_time), int(self.x - camera_x), int(self.y))
+
+    @staticmethod
+    def sprite_states():
+        return [(timer, 18) for timer in range(19)]
+
+    @staticmethod
+    def bake(state):
+        timer, max_time = state
+        progress = timer / max(1, max_time)
         radius = int(8 + progress * 48)
         alpha = int(max(0, 220 * (1 - progress)))
         surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
         color_rgb = (255, int(max(0, 120 * (1 - progress))), 0)
 
-        pygame.draw.circle(surf, color_rgb, (radius, radius), radius)
-        surf.set_alpha(alpha)
-        draw_x = int(self.x - camera_x) - radius
-        draw_y = int(self.y) - radius
-        screen.blit(surf, (draw_x, draw_y))
-
-class Game:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("🔥 DevilCoder - Kuldeep singh 🔥")
-        self.clock = pygame.time.Clock()
-        self.running = True
-        self.score = 0
-
-        self.Total_score = 0
-
-        self.last_score_snapshot = 0
+        pygame.draw.circle(surf, color_rgb + (alpha,), (radius, radius), radius)
+        return surf, (radius, radius)
 
-        self.highscore_path = os.path.join(os.path.dirname(__file__), 'highscore.txt')
-        self.high_score = 0
-        try:
-            if os.path.exists(self.highscore_path):
-                with open(self.highscore_path, 'r') as f:
-                    self.high_score = int(f.read().strip() or 0)
-        except Exception:
-            self.high_score = 0
-        self.lives = 3
-        self.font = pygame.font.Font(None, 36)
-        self.chaos_timer = 0
-        self.game_mode = "platformer"
-        
+class DirtyCompositor:
+    """Dirty-rectangle presenter for mostly static scenes.
 
-        self.player = Player(50, SCREEN_HEIGHT - 200)
-        
-
-        self.car = Car(100, SCREEN_HEIGHT - 180)
-
-        self.obstacles = []
-        self.obstacle_timer = 0
+    Static content is baked into a backdrop that is rebuilt only when
+    `static_key` changes. Each frame the previous sprite rects are restored
+    from the backdrop, every sprite is redrawn and HUD blits are repeated only
+    where something touched them. present() returns the rects to push with
+    pygame.display.update(), or None when the whole screen must be flipped.
+    """
+    def __init__(self):
+        self.backdrop = None
+        self.static_key = None
+        self.prev_sprites = []
+        self.prev_hud = []
+        self.full_frames = 0
+        self.partial_frames = 0
+        self.rects_pushed = 0
+        self.pixels_pushed = 0
+
+    def invalidate(self):
+        self.static_key = None
+
+    def present(self, screen, static_key, draw_static, sprites, draw_sprites, hud):
+        """`sprites` are this frame's sprite bounds, `hud` is a list of (surface, rect)"""
+        if self.backdrop is None or self.backdrop.get_size() != screen.get_size():
+            self.backdrop = pygame.Surface(screen.get_size()).convert()
+            self.static_key = None
+
+        if static_key != self.static_key:
+            self.static_key = static_key
+            draw_static(self.backdrop)
+            screen.blit(self.backdrop, (0, 0))
+            draw_sprites(screen)
+            for surf, rect in hud:
+                screen.blit(surf, rect)
+            self.prev_sprites = sprites
+            self.prev_hud = hud
+            self.full_frames += 1
+            self.pixels_pushed += screen.get_width() * screen.get_height()
+            return None
+
+        current = {(id(surf), tuple(rect)) for surf, rect in hud}
+        restore = list(self.prev_sprites)
+        for surf, rect in self.prev_hud:
+            if (id(surf), tuple(rect)) not in current:
+                restore.append(rect)
+        previous = {(id(surf), tuple(rect)) for surf, rect in self.prev_hud}
+        touched = restore + sprites
+        redraw = [(surf, rect) for surf, rect in hud
+                  if (id(surf), tuple(rect)) not in previous or rect.collidelist(touched) != -1]
+
+        backdrop = self.backdrop
+        for rect in restore:
+            screen.blit(backdrop, rect, rect)
+        for surf, rect in redraw:
+            screen.blit(backdrop, rect, rect)
+        draw_sprites(screen)
+        for surf, rect in redraw:
+            screen.blit(surf, rect)
+
+        dirty = touched + [rect for surf, rect in redraw]
+        self.prev_sprites = sprites
+        self.prev_hud = hud
+        self.partial_frames += 1
+        self.rects_pushed += len(dirty)
+        self.pixels_pushed += sum(r.width * r.height for r in dirty)
+        return dirty
+
+    def stats(self):
+        frames = max(1, self.full_frames + self.partial_frames)
+        return {'full_frames': self.full_frames, 'partial_frames': self.partial_frames,
+                'rects_pushed': self.rects_pushed,
+                'avg_screen_fraction': self.pixels_pushed / frames / (SCREEN_WIDTH * SCREEN_HEIGHT)}
+
+
+class Terrain:
+    """Seeded hill-climb heightfield, generated in NumPy chunks as the car advances.
+
+    The surface is a fixed sum of sines, so a chunk is a pure function of
+    its index: chunks are (re)computed into a ring of TERRAIN_SLOTS slots,
+    overwriting whatever fell out of range, and lookups never depend on
+    generation order. height()/slope() are O(1) reads from the ring. The
+    first stretch is flat at ROAD_Y so every run starts on level ground.
+    Each chunk's road strip is baked once from the same samples for drawing;
+    the flat road left of x=0, where the camera starts, is baked into
+    lead-in chunks kept outside the ring.
+    """
+    GRASS = 20
+    TREE = 45
+
+    def __init__(self, seed=0, roughness=1.0, chunk=TERRAIN_CHUNK, slots=TERRAIN_SLOTS):
+        rng = np.random.default_rng(seed)
+        self.chunk = chunk
+        self.slots = slots
+        base_freqs = np.array([0.003, 0.007, 0.016, 0.035])
+        self.amps = np.array([45.0, 25.0, 12.0, 5.0])[:, None] * roughness
+        self.freqs = (base_freqs * rng.uniform(0.8, 1.2, base_freqs.size))[:, None]
+        self.phases = rng.uniform(0, 2 * np.pi, base_freqs.size)[:, None]
+        self.top = int(ROAD_Y - self.amps.sum()) - self.GRASS - self.TREE - 2
+        self.heights = np.zeros((slots, chunk + 1))
+        self.tags = [None] * slots
+        self.surfaces = [None] * slots
+        self.flat = np.full(chunk + 1, float(ROAD_Y))
+        self.lead_in = {}
+        self.generated = 0
+        self.misses = 0
+        self.generate(0)
+
+    def generate(self, index):
+        xs = np.arange(index * self.chunk, (index + 1) * self.chunk + 1, dtype=np.float64)
+        ramp = np.clip((xs - 600.0) / 800.0, 0.0, 1.0)
+        ramp = ramp * ramp * (3 - 2 * ramp)
+        waves = (self.amps * np.sin(self.freqs * xs + self.phases)).sum(axis=0)
+        slot = index % self.slots
+        self.heights[slot] = ROAD_Y + ramp * waves
+        self.tags[slot] = index
+        self.surfaces[slot] = None
+        self.generated += 1
+        return slot
+
+    def _samples(self, index):
+        if index < 0:
+            return self.flat
+        slot = index % self.slots
+        if self.tags[slot] != index:
+            self.misses += 1
+            self.generate(index)
+        return self.heights[slot]
+
+    def prefetch(self, x, ahead=4):
+        """Generate at most one missing chunk within `ahead` chunks of x (one per sim step).
+
+        Bullets live until car.x + 2 * SCREEN_WIDTH, so the default covers them too.
+        """
+        first = int(x // self.chunk)
+        for index in range(first, first + ahead + 1):
+            if self.tags[index % self.slots] != index:
+                self.generate(index)
+                return
+
+    def height(self, x):
+        """Road surface y at world x"""
+        x = max(0.0, x)
+        index = int(x // self.chunk)
+        local = x - index * self.chunk
+        i = int(local)
+        samples = self._samples(index)
+        h0 = samples[i]
+        return float(h0 + (samples[i + 1] - h0) * (local - i))
+
+    def slope(self, x):
+        """dy/dx of the surface at world x (positive = downhill going right)"""
+        x = max(0.0, x)
+        index = int(x // self.chunk)
+        i = int(x - index * self.chunk)
+        samples = self._samples(index)
+        return float(samples[i + 1] - samples[i])
+
+    def bake(self, index):
+        """Road strip for one chunk: grass verge, asphalt, lane dashes and roadside trees"""
+        samples = self._samples(index)
+        slot = index % self.slots
+        width = self.chunk
+        surf = pygame.Surface((width + 1, SCREEN_HEIGHT - self.top))
+        surf.fill(ParallaxBackground.COLORKEY)
+        step = 8
+        xs = np.arange(0, width + 1, step)
+        ys = samples[xs] - self.top
+        surface = [(int(x), int(y)) for x, y in zip(xs, ys)]
+        bottom = SCREEN_HEIGHT - self.top
+        world_x = index * width
+        # Trees every 120 world px; ones straddling an edge are drawn by both chunks.
+        for tree_x in range((80 - world_x) % 120 - 120, width + 16, 120):
+            if tree_x >= -15:
+                ground = int(self.height(world_x + tree_x) - self.top) - self.GRASS
+                pygame.draw.rect(surf, BROWN, (tree_x - 5, ground - 30, 10, 30))
+                pygame.draw.circle(surf, (0, 100, 0), (tree_x, ground - 30), 15)
+        pygame.draw.polygon(surf, GREEN, [(x, y - self.GRASS) for x, y in surface] + [(width, bottom), (0, bottom)])
+        pygame.draw.polygon(surf, (50, 50, 50), surface + [(width, bottom), (0, bottom)])
+        # Lane dashes cover world x % 100 < 50, 90px below the surface.
+        for x0 in range(-(world_x % 100), width, 100):
+            x1 = min(x0 + 50, width)
+            x0 = max(x0, 0)
+            if x1 - x0 > 1:
+                pts = [(x, int(samples[x] - self.top) + 90) for x in list(range(x0, x1, 10)) + [x1]]
+                pygame.draw.lines(surf, YELLOW, False, pts, 5)
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert()
+        surf.set_colorkey(ParallaxBackground.COLORKEY, pygame.RLEACCEL)
+        if index < 0:
+            self.lead_in[index] = surf
+        else:
+            self.surfaces[slot] = surf
+        return surf
+
+    def draw(self, screen, camera_x):
+        first = int(camera_x // self.chunk)
+        last = int((camera_x + SCREEN_WIDTH) // self.chunk)
+        for index in range(first, last + 1):
+            slot = index % self.slots
+            if index < 0:
+                surf = self.lead_in.get(index)
+            else:
+                surf = self.surfaces[slot] if self.tags[slot] == index else None
+            if surf is None:
+                surf = self.bake(index)
+            screen.blit(surf, (int(index * self.chunk - camera_x), self.top))
+        # Bake the next chunk ahead of time so it is ready when it scrolls in.
+        upcoming = last + 1
+        slot = upcoming % self.slots
+        if self.tags[slot] == upcoming and self.surfaces[slot] is None:
+            self.bake(upcoming)
+
+    def stats(self):
+        return {'generated': self.generated, 'misses': self.misses, 'slots': self.slots}
+
+
+class ParallaxLayer:
+    """A pre-rendered strip that wraps horizontally and scrolls at `factor` x camera"""
+    def __init__(self, surface, y, factor):
+        self.surface = surface
+        self.y = y
+        self.factor = factor
+        self.width = surface.get_width()
 
-        self.bullets = []
-        self.bullet_cooldown = 0
+    def draw(self, screen, camera_x):
+        x = -int((camera_x * self.factor) % self.width)
+        while x < SCREEN_WIDTH:
+            screen.blit(self.surface, (x, self.y))
+            x += self.width
 
 
-        self.muzzles = []
-        self.explosions = []
+class ParallaxBackground:
+    """Hill-climb sky, clouds and distant hills, baked once and blitted per frame (Terrain draws the road)"""
+    COLORKEY = (255, 0, 255)
 
-        self.golden_coin = None
-        
-
-        self.platforms = [
-            Platform(0, SCREEN_HEIGHT - 100, SCREEN_WIDTH, 100),
-            Platform(200, SCREEN_HEIGHT - 200, 150, 20),
-            DisappearingPlatform(400, SCREEN_HEIGHT - 300, 150, 20),
-            MovingPlatform(600, SCREEN_HEIGHT - 250, 150, 20, 550, 750, 2),
-            BouncePlatform(750, SCREEN_HEIGHT - 350, 100, 20),
-            DisappearingPlatform(300, SCREEN_HEIGHT - 450, 100, 20),
-            MovingPlatform(500, SCREEN_HEIGHT - 500, 200, 20, 400, 700, 1),
-        ]
-        
-        self.enemies = [
-            Enemy(210, SCREEN_HEIGHT - 230, 200, 350),
-            Enemy(410, SCREEN_HEIGHT - 330, 400, 550),
-            Enemy(610, SCREEN_HEIGHT - 280, 600, 750),
-        ]
-        
-        self.coins = [
-            Coin(250, SCREEN_HEIGHT - 240),
-            Coin(450, SCREEN_HEIGHT - 340),
-            Coin(650, SCREEN_HEIGHT - 290),
-            Coin(800, SCREEN_HEIGHT - 390),
-            Coin(350, SCREEN_HEIGHT - 490),
-        ]
-        
-        self.powerups = [
-            PowerUp(320, SCREEN_HEIGHT - 240, 'speed'),
-            PowerUp(780, SCREEN_HEIGHT - 390, 'jump'),
-            PowerUp(520, SCREEN_HEIGHT - 540, 'invulnerable'),
-            PowerUp(100, SCREEN_HEIGHT - 140, 'reverse'),
+    def __init__(self):
+        self.layers = [
+            ParallaxLayer(self.bake_sky(), 0, 0),
+            ParallaxLayer(self.bake_clouds(), 50, 0.3),
+            ParallaxLayer(self.bake_hills(), SCREEN_HEIGHT - 250, 0.5),
         ]
-        
-        road_y = SCREEN_HEIGHT - 150
 
-        self.red_coin = RedCoin(SCREEN_WIDTH - 120, road_y - 25)
+    def draw(self, screen, camera_x):
+        for layer in self.layers:
+            layer.draw(screen, camera_x)
+
+    def _keyed(self, width, height):
+        surf = pygame.Surface((width, height))
+        surf.fill(self.COLORKEY)
+        return surf
+
+    def _finish(self, surf, keyed=True):
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert()
+        if keyed:
+            surf.set_colorkey(self.COLORKEY, pygame.RLEACCEL)
+        return surf
+
+    def bake_sky(self):
+        surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        surf.fill((135, 206, 235))
+        for y in range(SCREEN_HEIGHT // 2):
+            color_ratio = y / (SCREEN_HEIGHT // 2)
+            sky_color = (
+                int(135 + (200 - 135) * color_ratio),
+                int(206 + (230 - 206) * color_ratio),
+                int(235 + (255 - 235) * color_ratio)
+            )
+            pygame.draw.line(surf, sky_color, (0, y), (SCREEN_WIDTH, y))
+        return self._finish(surf, keyed=False)
 
-    def reset_to_platformer_start(self):
+    def bake_clouds(self):
+        # Clouds repeat every SCREEN_WIDTH + 200 screen pixels at 0.3x scroll.
+        width = SCREEN_WIDTH + 200
+        surf = self._keyed(width, 120)
+        for i in range(8):
+            cloud_x = (50 + i * 200 - 100) % width
+            cloud_y = 80 + (i % 3) * 30 - 50
+            for wrap in (-width, 0, width):
+                x = cloud_x + wrap
+                pygame.draw.circle(surf, WHITE, (x, cloud_y), 30)
+                pygame.draw.circle(surf, WHITE, (x - 20, cloud_y), 20)
+                pygame.draw.circle(surf, WHITE, (x + 20, cloud_y), 20)
+        return self._finish(surf)
+
+    def bake_hills(self):
+        # Two periods of the ~785px hill wave, rounded so the tile wraps seamlessly.
+        width = int(round(2 * 2 * math.pi / 0.008))
+        top = SCREEN_HEIGHT - 250
+        surf = self._keyed(width, SCREEN_HEIGHT - top)
+        points = [(x, SCREEN_HEIGHT - 200 - top + int(50 * math.sin(2 * 2 * math.pi * x / width)))
+                  for x in range(0, width + 10, 10)]
+        points.append((width + 10, SCREEN_HEIGHT - top))
+        points.append((0, SCREEN_HEIGHT - top))
+        pygame.draw.polygon(surf, (34, 139, 34), points)
+        return self._finish(surf)
+
+
+DEFAULT_LEVEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels', 'default.json')
+
+
+class LevelTemplate(namedtuple('LevelTemplate', 'name width player platforms enemies coins powerups red_coin')):
+    """Immutable platformer layout parsed once from a level file.
+
+    Fields hold only tuples of numbers and strings, so one template is shared
+    by every restart; build() and build_red_coin() hand out fresh entities.
+    """
+    __slots__ = ()
+    PLATFORM_TYPES = {'platform': Platform, 'moving': MovingPlatform,
+                      'disappearing': DisappearingPlatform, 'bounce': BouncePlatform}
+    POWERUP_TYPES = ('speed', 'jump', 'invulnerable', 'reverse')
+    _loaded = {}
+
+    @classmethod
+    def load(cls, path=DEFAULT_LEVEL):
+        path = os.path.abspath(path)
+        template = cls._loaded.get(path)
+        if template is None:
+            with open(path) as f:
+                data = json.load(f)
+            template = cls._loaded[path] = cls.parse(data, os.path.basename(path))
+        return template
+
+    @staticmethod
+    def _numbers(values, count):
+        values = tuple(values)
+        if len(values) != count or not all(isinstance(v, (int, float)) and not isinstance(v, bool)
+                                           for v in values):
+            raise ValueError(f'expected {count} numbers, got {list(values)!r}')
+        return values
+
+    @classmethod
+    def parse(cls, data, source='level'):
+        numbers = cls._numbers
+        try:
+            platforms = []
+            for spec in data['platforms']:
+                kind = spec['type']
+                if kind not in cls.PLATFORM_TYPES:
+                    raise ValueError(f'unknown platform type {kind!r}')
+                args = numbers(spec['rect'], 4)
+                if kind == 'moving':
+                    args += numbers(spec['range'], 2) + numbers([spec.get('speed', 1)], 1)
+                platforms.append((kind, args))
+            enemies = tuple(numbers(e['pos'], 2) + numbers(e['patrol'], 2) for e in data.get('enemies', ()))
+            coins = tuple(numbers(pos, 2) for pos in data.get('coins', ()))
+            powerups = []
+            for spec in data.get('powerups', ()):
+                if spec['type'] not in cls.POWERUP_TYPES:
+                    raise ValueError(f"unknown powerup type {spec['type']!r}")
+                powerups.append(numbers(spec['pos'], 2) + (spec['type'],))
+            red_coin = data.get('red_coin')
+            template = cls(
+                name=str(data.get('name', source)),
+                width=0,
+                player=numbers(data['player'], 2),
+                platforms=tuple(platforms),
+                enemies=enemies,
+                coins=coins,
+                powerups=tuple(powerups),
+                red_coin=numbers(red_coin, 2) if red_coin is not None else None,
+            )
+            width = data.get('width')
+            if width is None:
+                width = max([SCREEN_WIDTH] + [right for _, _, right in template.extents()])
+            return template._replace(width=numbers([width], 1)[0])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f'{source}: bad level data: {e}') from e
+
+    def extents(self):
+        """(key, left, right) world x reach of every entity spec, patrol/travel range included"""
+        for i, (kind, args) in enumerate(self.platforms):
+            x, y, w, h = args[:4]
+            if kind == 'moving':
+                yield ('platforms', i), min(x, args[4]), max(x, args[5]) + w
+            else:
+                yield ('platforms', i), x, x + w
+        for i, (x, y, left, right) in enumerate(self.enemies):
+            yield ('enemies', i), min(x, left), max(x + 30, right)
+        for i, (x, y) in enumerate(self.coins):
+            yield ('coins', i), x, x + 20
+        for i, (x, y, kind) in enumerate(self.powerups):
+            yield ('powerups', i), x, x + 25
+
+    def build(self, group, index):
+        """One fresh entity from its spec, e.g. build('enemies', 2)"""
+        if group == 'platforms':
+            kind, args = self.platforms[index]
+            return self.PLATFORM_TYPES[kind](*args)
+        if group == 'enemies':
+            return Enemy(*self.enemies[index])
+        if group == 'coins':
+            return Coin(*self.coins[index])
+        x, y, kind = self.powerups[index]
+        return PowerUp(x, y, kind)
+
+    def build_red_coin(self):
+        return RedCoin(*self.red_coin) if self.red_coin else None
+
+
+class ChunkManager:
+    """Keeps only level entities near the camera awake.
+
+    Specs are bucketed into `chunk_width` slices by their left-most reach.
+    A chunk's entities are built from the template the first time it comes
+    within `margin` of the view; when it drifts out again they sleep with
+    their state intact and are neither updated, collided nor drawn. The
+    awake lists stay in template order, so a level that fits the view
+    behaves exactly as if nothing were streamed.
+    """
+    GROUPS = ('platforms', 'enemies', 'coins', 'powerups')
+    _layouts = {}
+
+    def __init__(self, level, chunk_width=CHUNK_WIDTH, margin=CHUNK_WIDTH):
+        self.level = level
+        self.chunk_width = chunk_width
+        self.margin = margin
+        self.chunks = self.layout(level, chunk_width)
+        self.entities = {}
+        self.removed = set()
+        self.awake = {group: [] for group in self.GROUPS}
+        self.keys = []
+        self.active = ()
+        self.window = None
+        self.built = 0
+        self.wakes = 0
+
+    @classmethod
+    def layout(cls, level, chunk_width):
+        """[(left, reach, keys)] per chunk, computed once per template"""
+        cache_key = (id(level), chunk_width)
+        cached = cls._layouts.get(cache_key)
+        if cached is not None and cached[0] is level:
+            return cached[1]
+        buckets = {}
+        for key, left, right in level.extents():
+            index = max(0, int(left // chunk_width))
+            bucket = buckets.setdefault(index, [index * chunk_width, right, []])
+            bucket[1] = max(bucket[1], right)
+            bucket[2].append(key)
+        chunks = [(left, reach, tuple(keys)) for _, (left, reach, keys) in sorted(buckets.items())]
+        cls._layouts[cache_key] = (level, chunks)
+        return chunks
+
+    def update(self, camera_x, lists):
+        """Wake/sleep chunks for the view at `camera_x`; True if `lists` were replaced.
+
+        `lists` maps group name to the game's awake list; entities missing
+        from it (collected coins and powerups) are dropped for good.
+        """
+        cw = self.chunk_width
+        window = (int((camera_x - self.margin) // cw), int((camera_x + SCREEN_WIDTH + self.margin) // cw))
+        if window == self.window:
+            return False
+        self.window = window
+        left, right = window[0] * cw, (window[1] + 1) * cw
+
+        for group in ('coins', 'powerups'):
+            alive = {id(e) for e in lists.get(group, ())}
+            for key, entity in zip(self.awake_keys(group), self.awake[group]):
+                if id(entity) not in alive:
+                    self.removed.add(key)
+
+        active = tuple(i for i, (chunk_left, reach, _) in enumerate(self.chunks)
+                       if chunk_left <= right and reach >= left)
+        if active == self.active:
+            return False
+        self.wakes += len(set(active) - set(self.active))
+        self.active = active
+
+        keys = sorted(key for i in active for key in self.chunks[i][2] if key not in self.removed)
+        awake = {group: [] for group in self.GROUPS}
+        entities = self.entities
+        for key in keys:
+            entity = entities.get(key)
+            if entity is None:
+                entity = entities[key] = self.level.build(*key)
+                self.built += 1
+            awake[key[0]].append(entity)
+        self.keys = keys
+        self.awake = awake
+        return True
+
+    def awake_keys(self, group):
+        return [key for key in self.keys if key[0] == group]
+
+    def stats(self):
+        return {'chunks': len(self.chunks), 'active': len(self.active), 'built': self.built,
+                'specs': sum(len(keys) for _, _, keys in self.chunks), 'wakes': self.wakes}
 
 
-        print('[Game] reset_to_platformer_start called')
+class Game:
+    def __init__(self, headless=None, input_source=None, render_every=None, dirty_rects=True,
+                 highscore_path=HIGHSCORE_PATH, seed=None, level=None, entity_storage='objects'):
+        STARTUP.mark('main')
+        if entity_storage not in ('objects', 'arrays'):
+            raise ValueError(f'unknown entity_storage {entity_storage!r}')
+        # 'arrays' steps and collides the awake platformer entities as NumPy columns (EntityArrays).
+        self.entity_storage = entity_storage
+        self.headless = HEADLESS if headless is None else headless
+        if self.headless:
+            use_dummy_display()
+        self.input = input_source or (ScriptedInput() if self.headless else KeyboardInput())
+        # Render every Nth frame; 0 skips rendering entirely (headless default).
+        if render_every is None:
+            render_every = 0 if self.headless else 1
+        self.render_every = render_every
+        # Every simulation random draw goes through self.rng so a session is
+        # reproducible from its seed; fx_rng is for render-only jitter.
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), 'little') >> 1
+        self.session_seed = seed
+        self.fx_rng = random.Random()
+        self.dirty_rects = dirty_rects
+        self.compositor = DirtyCompositor()
+        self.interpolate = True
+        self.render_fps = RENDER_FPS
+        self.sim_clock = FixedStepClock()
+        self.profiler = FrameProfiler()
+        self.profile_path = None
+        # Set to a FrameCapture to grab every rendered frame (here and in the dino loop).
+        self.frame_capture = None
+        # Print STARTUP's report once the first frame is on screen.
+        self.report_startup = False
+        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        STARTUP.mark('display')
+        SPRITES.prebake()
+        STARTUP.mark('sprites')
+        self.clock = pygame.time.Clock()
+        self.running = True
 
+        self.highscore_path = highscore_path
+        self.high_score_store = HighScoreStore(highscore_path)
+        self.high_score = self.high_score_store.load()
+        STARTUP.mark('highscore')
+        self.font = TEXT_CACHE.font(36)
+        self.ui_font = TEXT_CACHE.font(32)
+        self.hud = {
+            'total': HudField(36, "Score: {}"),
+            'high': HudField(36, "Top: {}"),
+            'hc_total': HudField(32, "Score: {}"),
+            'hc_high': HudField(32, "Top: {}"),
+            'hc_score': HudField(32, "Score: {}"),
+            'hc_lives': HudField(32, "Lives: {}"),
+            'hc_fuel': HudField(32, "Fuel: {}"),
+            'hc_distance': HudField(32, "Distance: {}m"),
+            'hc_speed': HudField(32, "Speed: {} km/h"),
+        }
+        STARTUP.mark('fonts')
+        self.level = level if isinstance(level, LevelTemplate) else LevelTemplate.load(level or DEFAULT_LEVEL)
+        STARTUP.mark('level')
+
+        self.obstacles = EntityPool(ObstacleCar, 256)
+        self.bullets = EntityPool(Bullet, 512)
+        self.muzzles = EntityPool(MuzzleFlash, 128)
+        self.explosions = EntityPool(Explosion, 128)
+        self.hill_background = ParallaxBackground()
+        self.static_overlays = {}
+        self.overlay_scratch = None
+        # Every scene is built once here; mode switches only move them on the stack.
+        self.scenes = SceneStack()
+        self.play_scenes = {name: PlayScene(self, name) for name in ('platformer', 'hill_climb')}
+        self.dino_scene = DinoScene(self)
+        self.game_over_scene = GameOverScene(self)
+        self.pause_scene = PauseScene(self)
+        STARTUP.mark('scenes')
+        self.restart(seed)
+        STARTUP.mark('session')
+
+    @property
+    def game_mode(self):
+        return self.scenes.base().name
+
+    @game_mode.setter
+    def game_mode(self, mode):
+        self.scenes.switch(self.play_scenes[mode])
+
+    def restart(self, seed):
+        """Fresh session from the level template; the window, fonts, pools and store are kept"""
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.frame_count = 0
+        self.chaos_timer = 0
+        self.obstacle_timer = 0
+        self.bullet_cooldown = 0
+        self.high_score_store.flush()
+        self.scenes.unwind()
+        self.start_level()
+
+    def start_level(self):
+        """Scores, lives, player, car and every level entity back to their starting state"""
         self.Total_score = 0
         self.game_mode = 'platformer'
         self.lives = 3
         self.score = 0
         self.last_score_snapshot = 0
 
-        self.player = Player(50, SCREEN_HEIGHT - 200)
+        level = self.level
+        self.player = Player(*level.player)
         self.car = Car(100, SCREEN_HEIGHT - 180)
-        self.obstacles = []
-        self.bullets = []
-        self.muzzles = []
-        self.explosions = []
+        self.terrain = Terrain(self.seed)
+        self.obstacles.clear()
+        self.bullets.clear()
+        self.muzzles.clear()
+        self.explosions.clear()
         self.golden_coin = None
 
-        self.platforms = [
-            Platform(0, SCREEN_HEIGHT - 100, SCREEN_WIDTH, 100),
-            Platform(200, SCREEN_HEIGHT - 200, 150, 20),
-            DisappearingPlatform(400, SCREEN_HEIGHT - 300, 150, 20),
-            MovingPlatform(600, SCREEN_HEIGHT - 250, 150, 20, 550, 750, 2),
-            BouncePlatform(750, SCREEN_HEIGHT - 350, 100, 20),
-            DisappearingPlatform(300, SCREEN_HEIGHT - 450, 100, 20),
-            MovingPlatform(500, SCREEN_HEIGHT - 500, 200, 20, 400, 700, 1),
-        ]
-        self.enemies = [
-            Enemy(210, SCREEN_HEIGHT - 230, 200, 350),
-            Enemy(410, SCREEN_HEIGHT - 330, 400, 550),
-            Enemy(610, SCREEN_HEIGHT - 280, 600, 750),
-        ]
-        self.coins = [
-            Coin(250, SCREEN_HEIGHT - 240),
-            Coin(450, SCREEN_HEIGHT - 340),
-            Coin(650, SCREEN_HEIGHT - 290),
-            Coin(800, SCREEN_HEIGHT - 390),
-            Coin(350, SCREEN_HEIGHT - 490),
-        ]
-        self.powerups = [
-            PowerUp(320, SCREEN_HEIGHT - 240, 'speed'),
-            PowerUp(780, SCREEN_HEIGHT - 390, 'jump'),
-            PowerUp(520, SCREEN_HEIGHT - 540, 'invulnerable'),
-            PowerUp(100, SCREEN_HEIGHT - 140, 'reverse'),
-        ]
+        # Platformer camera; the hill-climb one lives on the car.
+        self.camera_x = 0
+        self.chunks = ChunkManager(level)
+        self.platforms, self.enemies, self.coins, self.powerups = [], [], [], []
+        self.red_coin = level.build_red_coin()
+        self.stream_level()
+        self.build_broadphase()
+        self.compositor.invalidate()
+
+    def stream_level(self):
+        """Swap in the entities of the chunks around the camera once it crosses a chunk edge"""
+        if self.chunks.update(self.camera_x, {'coins': self.coins, 'powerups': self.powerups}):
+            awake = self.chunks.awake
+            self.platforms = list(awake['platforms'])
+            self.enemies = list(awake['enemies'])
+            self.coins = list(awake['coins'])
+            self.powerups = list(awake['powerups'])
+            self.build_broadphase()
+            self.compositor.invalidate()
+
+    def update_camera(self):
+        """Follow the player like the hill-climb camera follows the car, clamped to the level"""
+        target = self.player.x - SCREEN_WIDTH // 3
+        camera_x = self.camera_x + (target - self.camera_x) * 0.1
+        self.camera_x = max(0, min(camera_x, self.level.width - SCREEN_WIDTH))
+        self.stream_level()
+
+    def build_broadphase(self):
+        """(Re)build the spatial hashes (or entity arrays) used for every collision query"""
+        if self.entity_storage == 'arrays':
+            self.sync_entities()
+            self.platform_grid = PlatformArrays(self.platforms)
+            self.enemy_grid = EnemyArrays(self.enemies)
+            self.pickup_grid = EntityArrays(self.coins + self.powerups)
+        else:
+            self.platform_grid = broadphase(
+                self.platforms, static=sum(not isinstance(p, MovingPlatform) for p in self.platforms))
+            self.enemy_grid = broadphase(self.enemies, static=0)
+            self.pickup_grid = broadphase(self.coins + self.powerups)
+        self.obstacle_grid = SpatialHash(256, self.obstacles)
+
+    def sync_entities(self):
+        """Write entity_storage='arrays' state back to the platform and enemy objects before reading them"""
+        for grid in (getattr(self, 'platform_grid', None), getattr(self, 'enemy_grid', None)):
+            if isinstance(grid, EntityArrays):
+                grid.sync()
+
+    def reset_to_platformer_start(self):
+
+
+        print('[Game] reset_to_platformer_start called')
+        self.high_score_store.flush()
+        self.start_level()
         
     def handle_events(self):
-        for event in pygame.event.get():
+        events = self.input.get_events()
+        for i, event in enumerate(events):
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type == pygame.VIDEOEXPOSE:
+                self.compositor.invalidate()
             elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r and self.lives <= 0:
-                    self.__init__()
+                if event.key in PauseScene.keys:
+                    self.scenes.push(self.pause_scene)
+                    # Keys after the pause belong to no one: the game under the pause screen stays as it was.
+                    if any(e.type == pygame.QUIT for e in events[i + 1:]):
+                        self.running = False
+                    return
+                elif event.key == pygame.K_F2:
+                    self.dirty_rects = not self.dirty_rects
+                    self.compositor.invalidate()
+                elif event.key == pygame.K_F3:
+                    self.profiler.toggle_overlay()
+                elif event.key == pygame.K_F4 and self.profiler.enabled:
+                    self.profiler.export(self.profile_path or time.strftime('profile-%Y%m%d-%H%M%S.json'))
                 elif event.key == pygame.K_p and self.game_mode == "hill_climb":
                     self.game_mode = "platformer"
-                    pygame.display.set_caption("🔥 Devil Mario - Unexpected Chaos! 🔥")
+                    self.high_score_store.flush()
                 elif event.key == pygame.K_v:
 
                     if hasattr(self, 'car') and self.red_coin:
@@ -897,14 +3626,20 @@ class Game:
                     if self.game_mode == "hill_climb":
                         bx = self.car.x + self.car.width
                         by = self.car.y + 10
-                        self.bullets.append(Bullet(bx, by))
+                        self.bullets.spawn(bx, by)
 
-                        self.muzzles.append(MuzzleFlash(bx + 6, by + 2))
+                        self.muzzles.spawn(bx + 6, by + 2)
                         play_sound(SHOOT_SOUND)
                     
     def update(self):
+        profiler = self.profiler
+        t = profiler.start()
+        self.update_effects()
+        profiler.stop('effects', t)
         if self.game_mode == "hill_climb":
+            t = profiler.start()
             self.update_hill_climb()
+            profiler.stop('update_hill_climb', t)
 
         delta = int(self.score - getattr(self, 'last_score_snapshot', 0))
         if delta > 0:
@@ -913,66 +3648,80 @@ class Game:
 
             if self.Total_score > self.high_score:
                 self.high_score = int(self.Total_score)
-                try:
-                    with open(self.highscore_path, 'w') as f:
-                        f.write(str(self.high_score))
-                except Exception:
-                    pass
+                self.high_score_store.submit(self.high_score)
         elif self.lives > 0:
             self.chaos_timer += 1
-            
-
-            for platform in self.platforms:
-                platform.update()
+            self.update_camera()
+
+            t = profiler.start()
+            if self.entity_storage == 'arrays':
+                self.platform_grid.step()
+            else:
+                for platform in self.platforms:
+                    platform.update()
+                    if isinstance(platform, MovingPlatform):
+                        self.platform_grid.move(platform)
+            profiler.stop('platforms', t)
                 
-            self.player.update(self.platforms)
+            t = profiler.start()
+            self.player.update(self.platform_grid, self.input.get_pressed(), self.level.width)
+            profiler.stop('player', t)
             
-            for platform in self.platforms:
+            nearby = self.platform_grid.colliding(self.player.rect)
+            for platform in nearby:
                 if isinstance(platform, DisappearingPlatform):
-                    if self.player.rect.colliderect(platform.rect) and self.player.on_ground:
+                    if self.player.on_ground:
                         platform.trigger_disappear()
             
-            for platform in self.platforms:
+            for platform in nearby:
                 if isinstance(platform, BouncePlatform):
-                    if (self.player.rect.colliderect(platform.rect) and 
-                        self.player.vel_y > 0 and 
+                    if (self.player.vel_y > 0 and 
                         self.player.rect.bottom <= platform.rect.top + 20):
                         self.player.vel_y = JUMP_STRENGTH * 2
                         play_sound(POWERUP_SOUND)
             
-            for enemy in self.enemies:
-                enemy.update()
+            t = profiler.start()
+            if self.entity_storage == 'arrays':
+                self.enemy_grid.step()
+            else:
+                for enemy in self.enemies:
+                    enemy.update()
+                    self.enemy_grid.move(enemy)
+            profiler.stop('enemies', t)
                 
             if self.player.invulnerable_timer <= 0:
-                for enemy in self.enemies:
-                    if self.player.rect.colliderect(enemy.rect):
-                        self.lives -= 1
-                        self.player.invulnerable_timer = 120
-                        self.player.x = 50
-                        self.player.y = SCREEN_HEIGHT - 200
-                        self.player.vel_x = 0
-                        self.player.vel_y = 0
-                        play_sound(HIT_SOUND)
+                for enemy in self.enemy_grid.colliding(self.player.rect):
+                    self.lives -= 1
+                    self.player.invulnerable_timer = 120
+                    self.player.x, self.player.y = self.level.player
+                    self.player.vel_x = 0
+                    self.player.vel_y = 0
+                    play_sound(HIT_SOUND)
                         
-            for coin in self.coins[:]:
-                if self.player.rect.colliderect(coin.rect):
+            t = profiler.start()
+            pickups = self.pickup_grid.colliding(self.player.rect)
+            profiler.stop('pickups', t)
+            had_coins = bool(self.coins)
+            for coin in pickups:
+                if isinstance(coin, Coin):
                     self.coins.remove(coin)
+                    self.pickup_grid.remove(coin)
                     self.score += 100
                     play_sound(COIN_SOUND)
                     
-                if self.red_coin and self.player.rect.colliderect(self.red_coin.rect):
-                    self.score += 500
-                    self.game_mode = "hill_climb"
-                    road_y = SCREEN_HEIGHT - 150
-                    forward_offset = 200
-                    coin_x = int(max(self.car.x - forward_offset, 0))
-                    self.red_coin = RedCoin(coin_x, road_y - 25)
-                    pygame.display.set_caption("🔥 DevilCoder - Kuldeep singh 🔥")
-                    play_sound(POWERUP_SOUND)
+            if had_coins and self.red_coin and self.player.rect.colliderect(self.red_coin.rect):
+                self.score += 500
+                self.game_mode = "hill_climb"
+                self.high_score_store.flush()
+                forward_offset = 200
+                coin_x = int(max(self.car.x - forward_offset, 0))
+                self.red_coin = RedCoin(coin_x, self.terrain.height(coin_x + 12) - 25)
+                play_sound(POWERUP_SOUND)
                     
-            for powerup in self.powerups[:]:
-                if self.player.rect.colliderect(powerup.rect):
+            for powerup in pickups:
+                if isinstance(powerup, PowerUp):
                     self.powerups.remove(powerup)
+                    self.pickup_grid.remove(powerup)
                     play_sound(POWERUP_SOUND)
                     if powerup.type == 'speed':
                         self.player.speed_boost_timer = 300
@@ -989,62 +3738,91 @@ class Game:
                         play_sound(HIT_SOUND)
                         
             if self.chaos_timer % 900 == 0:
-                chaos_event = random.randint(1, 3)
+                chaos_event = self.rng.randint(1, 3)
                 if chaos_event == 1:
                     self.player.reverse_controls = 180
                 elif chaos_event == 2:
                     self.player.speed_boost_timer = 240
                 elif chaos_event == 3:
-                    self.player.x = random.randint(100, SCREEN_WIDTH - 100)
+                    self.player.x = int(self.camera_x) + self.rng.randint(100, SCREEN_WIDTH - 100)
                     self.player.y = SCREEN_HEIGHT - 300
                     
             if self.player.y > SCREEN_HEIGHT:
                 self.lives -= 1
-                self.player.x = 50
-                self.player.y = SCREEN_HEIGHT - 200
+                self.player.x, self.player.y = self.level.player
                 self.player.vel_x = 0
                 self.player.vel_y = 0
 
+    def update_effects(self):
+        """Age coin glows and hill-climb effects (independent of rendering)"""
+        if self.red_coin:
+            self.red_coin.update()
+        if self.game_mode == "hill_climb":
+            muzzles = self.muzzles
+            for i in range(len(muzzles) - 1, -1, -1):
+                m = muzzles[i]
+                m.update()
+                if m.timer > m.lifetime:
+                    muzzles.release(m)
+            explosions = self.explosions
+            for i in range(len(explosions) - 1, -1, -1):
+                e = explosions[i]
+                e.update()
+                if e.timer > e.max_time:
+                    explosions.release(e)
+            if self.golden_coin:
+                self.golden_coin.update()
+
     def update_hill_climb(self):
         if self.car.fuel > 0:
-            self.car.update()
+            terrain = self.terrain
+            self.car.update(self.input.get_pressed(), terrain)
+            terrain.prefetch(self.car.x)
             self.obstacle_timer += 1
             if self.obstacle_timer > 180:
                 self.obstacle_timer = 0
-                spawn_x = int(self.car.x + SCREEN_WIDTH + random.randint(50, 300))
-                spawn_y = SCREEN_HEIGHT - 180
-                speed = 4 + random.random() * 2
-                self.obstacles.append(ObstacleCar(spawn_x, spawn_y, speed))
-            for obs in self.obstacles[:]:
-                obs.update()
+                spawn_x = int(self.car.x + SCREEN_WIDTH + self.rng.randint(50, 300))
+                spawn_y = terrain.height(spawn_x + 30) - 30
+                speed = 4 + self.rng.random() * 2
+                obs = self.obstacles.spawn(spawn_x, spawn_y, speed)
+                if obs is not None:
+                    self.obstacle_grid.insert(obs)
+            car_rect_world = pygame.Rect(self.car.x, self.car.y, self.car.width, self.car.height)
+            profiler = self.profiler
+            t = profiler.start()
+            obstacles = self.obstacles
+            for i in range(len(obstacles) - 1, -1, -1):
+                obs = obstacles[i]
+                obs.update(terrain)
                 if obs.x + obs.width < self.car.x - SCREEN_WIDTH:
-                    self.obstacles.remove(obs)
+                    self.obstacle_grid.remove(obs)
+                    obstacles.release(obs)
                 else:
-                    car_rect_world = pygame.Rect(self.car.x, self.car.y, self.car.width, self.car.height)
+                    self.obstacle_grid.move(obs)
                     if car_rect_world.colliderect(obs.rect):
                         self.lives = 0
                         play_sound(HIT_SOUND)
+                        profiler.stop('obstacles', t)
                         return
-            for b in self.bullets[:]:
+            profiler.stop('obstacles', t)
+            t = profiler.start()
+            bullets = self.bullets
+            for i in range(len(bullets) - 1, -1, -1):
+                b = bullets[i]
                 b.update()
-                if b.x > self.car.x + SCREEN_WIDTH * 2:
-                    self.bullets.remove(b)
+                if b.x > self.car.x + SCREEN_WIDTH * 2 or b.y + b.height > terrain.height(b.x + b.width):
+                    bullets.release(b)
                     continue
-                for obs in self.obstacles[:]:
-                    if b.rect.colliderect(obs.rect):
-                        try:
-                            self.obstacles.remove(obs)
-                        except ValueError:
-                            pass
-                        try:
-                            self.bullets.remove(b)
-                        except ValueError:
-                            pass
-                        self.explosions.append(Explosion(obs.x + obs.width/2, obs.y + obs.height/2))
-                        play_sound(BLAST_SOUND)
-                        self.score += 200
-                        play_sound(COIN_SOUND)
-                        break
+                for obs in self.obstacle_grid.colliding(b.rect):
+                    self.explosions.spawn(obs.x + obs.width/2, obs.y + obs.height/2)
+                    self.obstacle_grid.remove(obs)
+                    obstacles.release(obs)
+                    bullets.release(b)
+                    play_sound(BLAST_SOUND)
+                    self.score += 200
+                    play_sound(COIN_SOUND)
+                    break
+            profiler.stop('bullets', t)
 
             if self.bullet_cooldown > 0:
                 self.bullet_cooldown -= 1
@@ -1054,7 +3832,7 @@ class Game:
                     self.score += 500
                     self.red_coin = None
                     self.game_mode = "platformer"
-                    pygame.display.set_caption("🔥 DevilCoder -  singh 🔥")
+                    self.high_score_store.flush()
                     play_sound(POWERUP_SOUND)
             if self.car.fuel <= 0:
                 self.lives -= 1
@@ -1062,165 +3840,213 @@ class Game:
                     self.car = Car(100, SCREEN_HEIGHT - 180)
             if self.golden_coin is None and self.car.distance >= 800:
                 coin_x = int(self.car.x + SCREEN_WIDTH * 0.6)
-                road_y = SCREEN_HEIGHT - 150
-                self.golden_coin = GoldenCoin(coin_x, road_y - 25)
+                self.golden_coin = GoldenCoin(coin_x, terrain.height(coin_x + 13) - 25)
             if self.golden_coin:
                 car_rect_world = pygame.Rect(self.car.x, self.car.y, self.car.width, self.car.height)
                 if car_rect_world.colliderect(self.golden_coin.rect):
                     self.score += 2000
                     play_sound(POWERUP_SOUND)
                     self.golden_coin = None
-                    try:
-                        dino_ret = dinosaur_main(self)
-                        dino_score = None
-                        restart_flag = False
-                        try:
-                            if isinstance(dino_ret, tuple) and len(dino_ret) == 2:
-                                dino_score, restart_flag = dino_ret
-                            elif isinstance(dino_ret, (int, float)):
-                                dino_score = dino_ret
-                        except Exception:
-                            pass
-                        try:
-                            print(f'[update_hill_climb] dino_ret={dino_ret}')
-                            if isinstance(dino_score, (int, float)):
-                                self.Total_score += int(dino_score)
-                        except Exception:
-                            pass
-                        if restart_flag:
-                            print('[update_hill_climb] restart_flag True -> resetting to platformer start')
-                            try:
-                                self.reset_to_platformer_start()
-                                print('[update_hill_climb] reset_to_platformer_start completed')
-                            except Exception:
-                                print('[update_hill_climb] reset helper failed, using fallback')
-                                self.game_mode = 'platformer'
-                                self.lives = 3
-                                self.score = 0
-                                self.last_score_snapshot = 0
-                        pygame.init()
-                        pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
-                        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-                        pygame.display.set_caption("🔥 DevilCoder - Kuldeep singh 🔥")
-                    except Exception as e:
-                        print('Failed to launch embedded dinosaur game:', e)
-                    
-    def draw(self):
-        if self.game_mode == "hill_climb":
-            self.draw_hill_climb()
+                    self.scenes.push(self.dino_scene)
+
+    def end_dino_round(self, dino_score, restart):
+        """Back from the dino scenes: bank the round's score, or start over from the platformer"""
+        self.high_score_store.flush()
+        self.Total_score += int(dino_score)
+        if restart:
+            self.reset_to_platformer_start()
+
+    def draw(self, alpha=1.0):
+        """Render the top scene and present it; alpha in [0, 1) interpolates between sim steps"""
+        dirty = self.scenes.top().draw(alpha)
+        profiler = self.profiler
+        t = profiler.start()
+        if dirty is None:
+            pygame.display.flip()
         else:
-            self.draw_platformer()
+            pygame.display.update(dirty)
+        profiler.stop('present', t)
+        if self.frame_capture is not None:
+            t = profiler.start()
+            self.frame_capture.capture(self.screen)
+            profiler.stop('capture', t)
+        self.scenes.presented()
+        if STARTUP.frame_presented() and self.report_startup:
+            STARTUP.print_report()
+
+    def draw_play(self, alpha=1.0):
+        """Platformer/hill-climb frame; returns dirty rects, or None for a full flip"""
+        self.sync_entities()
+        saved = lerp_positions(self.interpolated_entities(), self.frame_count - 1, alpha)
+        camera_x = self.car.camera_x
+        level_camera_x = self.camera_x
+        if saved and self.game_mode == "hill_climb":
+            prev_camera_x = getattr(self, 'prev_camera_x', camera_x)
+            self.car.camera_x = prev_camera_x + (camera_x - prev_camera_x) * alpha
+        elif saved:
+            prev_camera_x = getattr(self, 'prev_level_camera_x', level_camera_x)
+            self.camera_x = prev_camera_x + (level_camera_x - prev_camera_x) * alpha
+        profiler = self.profiler
+        try:
+            if self.game_mode == "hill_climb":
+                self.compositor.invalidate()
+                t = profiler.start()
+                self.draw_hill_climb()
+                profiler.stop('draw_hill_climb', t)
+                dirty = None
+            else:
+                t = profiler.start()
+                dirty = self.draw_platformer()
+                profiler.stop('draw_platformer', t)
+        finally:
+            self.car.camera_x = camera_x
+            self.camera_x = level_camera_x
+            restore_positions(saved)
+        return dirty
             
+    def platformer_background(self):
+        return (200, 100, 200) if self.player.reverse_controls > 0 else (135, 206, 235)
+
+    def platformer_hud(self):
+        """(surface, rect) pairs for the platformer HUD, in blit order"""
+        items = []
+        Total_text = self.hud['total'].surface(self.Total_score)
+        items.append((Total_text, Total_text.get_rect(topleft=(10, 10))))
+        high_text = self.hud['high'].surface(self.high_score)
+        high_x = SCREEN_WIDTH // 2 - high_text.get_width() // 2
+        items.append((high_text, high_text.get_rect(topleft=(high_x, 10))))
+
+        effect_y = 60
+        for active, label, color in (
+                (self.player.speed_boost_timer > 0, "SPEED BOOST!", ORANGE),
+                (self.player.big_jump_timer > 0, "BIG JUMP!", LIME),
+                (self.player.invulnerable_timer > 0, "INVULNERABLE!", WHITE),
+                (self.player.reverse_controls > 0, "CONTROLS REVERSED!", PURPLE)):
+            if active:
+                effect_text = TEXT_CACHE.render(self.font, label, color)
+                items.append((effect_text, effect_text.get_rect(topleft=(10, effect_y))))
+                effect_y += 30
+
+        if self.lives <= 0:
+            game_over_text = TEXT_CACHE.render(self.font, "GAME OVER! Press R to restart", RED)
+            items.append((game_over_text, game_over_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))))
+
+        if self.lives > 0:
+            instruction_text = TEXT_CACHE.render(self.font, "FIND THE GLOWING RED COIN to switch game!", BLACK)
+            items.append((instruction_text, instruction_text.get_rect(topleft=(10, SCREEN_HEIGHT - 60))))
+            warning_text = TEXT_CACHE.render(self.font, " ", DARK_RED)
+            items.append((warning_text, warning_text.get_rect(topleft=(10, SCREEN_HEIGHT - 30))))
+        items.extend(self.profiler.overlay_items())
+        return items
+
     def draw_platformer(self):
-        if self.player.reverse_controls > 0:
-            self.screen.fill((200, 100, 200))
-        else:
-            self.screen.fill((135, 206, 235))
+        """Compose the platformer frame; returns the dirty rects, or None for a full flip"""
+        if self.dirty_rects:
+            return self.draw_platformer_dirty()
+
+        cam = int(self.camera_x)
+        self.screen.fill(self.platformer_background())
 
         for platform in self.platforms:
-            platform.draw(self.screen)
+            platform.draw(self.screen, cam)
 
         for enemy in self.enemies:
-            enemy.draw(self.screen)
+            enemy.draw(self.screen, cam)
 
         for coin in self.coins:
-            coin.draw(self.screen)
+            coin.draw(self.screen, cam)
 
         if self.red_coin:
-            self.red_coin.update()
-            self.red_coin.draw(self.screen)
+            self.red_coin.draw(self.screen, cam)
 
         for powerup in self.powerups:
-            powerup.draw(self.screen)
+            powerup.draw(self.screen, cam)
 
         if self.lives > 0:
-            self.player.draw(self.screen)
-
-        Total_text = self.font.render(f"Score: {self.Total_score}", True, BLACK)
-        self.screen.blit(Total_text, (10, 10))
-        high_text = self.font.render(f"Top: {self.high_score}", True, BLACK)
-        high_x = SCREEN_WIDTH // 2 - high_text.get_width() // 2
-        self.screen.blit(high_text, (high_x, 10))
-
-        effect_y = 60
-        if self.player.speed_boost_timer > 0:
-            effect_text = self.font.render("SPEED BOOST!", True, ORANGE)
-            self.screen.blit(effect_text, (10, effect_y))
-            effect_y += 30
-        if self.player.big_jump_timer > 0:
-            effect_text = self.font.render("BIG JUMP!", True, LIME)
-            self.screen.blit(effect_text, (10, effect_y))
-            effect_y += 30
-        if self.player.invulnerable_timer > 0:
-            effect_text = self.font.render("INVULNERABLE!", True, WHITE)
-            self.screen.blit(effect_text, (10, effect_y))
-            effect_y += 30
-        if self.player.reverse_controls > 0:
-            effect_text = self.font.render("CONTROLS REVERSED!", True, PURPLE)
-            self.screen.blit(effect_text, (10, effect_y))
-
-        if self.lives <= 0:
-            game_over_text = self.font.render("GAME OVER! Press R to restart", True, RED)
-            text_rect = game_over_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
-            self.screen.blit(game_over_text, text_rect)
-
+            self.player.draw(self.screen, cam)
+
+        for surf, rect in self.platformer_hud():
+            self.screen.blit(surf, rect)
+
+    def draw_platformer_dirty(self):
+        """Platformer frame through the dirty-rect compositor"""
+        moving = [p for p in self.platforms if isinstance(p, MovingPlatform)]
+        cam = int(self.camera_x)
+        static_key = (
+            cam,
+            self.platformer_background(),
+            self.lives > 0,
+            len(self.coins),
+            len(self.powerups),
+            tuple((p.visible, p.touch_timer > 0) for p in self.platforms
+                  if isinstance(p, DisappearingPlatform)),
+        )
+
+        def draw_static(surface):
+            self.static_overlays = {}
+            surface.fill(self.platformer_background())
+            for platform in self.platforms:
+                if not isinstance(platform, MovingPlatform):
+                    platform.draw(surface, cam)
+            for coin in self.coins:
+                coin.draw(surface, cam)
+            for powerup in self.powerups:
+                powerup.draw(surface, cam)
+
+        sprites = [p.bounds(cam) for p in moving] + [e.bounds(cam) for e in self.enemies]
+        if self.red_coin:
+            sprites.append(self.red_coin.bounds(cam))
         if self.lives > 0:
-            instruction_text = self.font.render("FIND THE GLOWING RED COIN to switch game!", True, BLACK)
-            self.screen.blit(instruction_text, (10, SCREEN_HEIGHT - 60))
-            warning_text = self.font.render(" ", True, DARK_RED)
-            self.screen.blit(warning_text, (10, SCREEN_HEIGHT - 30))
+            sprites.append(self.player.bounds(cam))
+
+        def redraw_under_sprites(surface, item, area):
+            area = area.clip(surface.get_rect())
+            hits = area.collidelistall(sprites) if area else None
+            if hits:
+                overlay = self.static_overlay(item, area, cam)
+                for i in hits:
+                    clip = area.clip(sprites[i])
+                    surface.blit(overlay, clip, clip.move(-area.x, -area.y))
+
+        def draw_sprites(surface):
+            # Static items under a sprite are drawn again (clipped to it) in
+            # full-redraw order, so layering matches the non-dirty path.
+            for platform in self.platforms:
+                if isinstance(platform, MovingPlatform):
+                    platform.draw(surface, cam)
+                else:
+                    redraw_under_sprites(surface, platform, platform.rect.move(-cam, 0))
+            for enemy in self.enemies:
+                enemy.draw(surface, cam)
+            for coin in self.coins:
+                redraw_under_sprites(surface, coin, coin.rect.move(-cam, 0).inflate(4, 4))
+            if self.red_coin:
+                self.red_coin.draw(surface, cam)
+            for powerup in self.powerups:
+                redraw_under_sprites(surface, powerup, powerup.rect.move(-cam, 0))
+            if self.lives > 0:
+                self.player.draw(surface, cam)
+
+        return self.compositor.present(self.screen, static_key, draw_static, sprites,
+                                       draw_sprites, self.platformer_hud())
             
+    def static_overlay(self, item, area, cam):
+        """Keyed copy of a static item's pixels in `area`, cached until the backdrop is rebuilt"""
+        overlay = self.static_overlays.get(id(item))
+        if overlay is None:
+            scratch = self.overlay_scratch
+            if scratch is None:
+                scratch = self.overlay_scratch = SPRITES.keyed_surface(SCREEN_WIDTH, SCREEN_HEIGHT)
+            scratch.fill(SpriteCache.COLORKEY, area)
+            item.draw(scratch, cam)
+            overlay = scratch.subsurface(area).copy()
+            overlay.set_colorkey(SpriteCache.COLORKEY)
+            self.static_overlays[id(item)] = overlay
+        return overlay
+
     def draw_hill_climb(self):
-        self.screen.fill((135, 206, 235))  
-        
-        sky_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT // 2))
-        for y in range(SCREEN_HEIGHT // 2):
-            color_ratio = y / (SCREEN_HEIGHT // 2)
-            sky_color = (
-                int(135 + (200 - 135) * color_ratio),
-                int(206 + (230 - 206) * color_ratio),
-                int(235 + (255 - 235) * color_ratio)
-            )
-            pygame.draw.line(sky_surface, sky_color, (0, y), (SCREEN_WIDTH, y))
-        self.screen.blit(sky_surface, (0, 0))
-        
-        for i in range(8):
-            cloud_x = (50 + i * 200 - self.car.camera_x * 0.3) % (SCREEN_WIDTH + 200) - 100
-            cloud_y = 80 + (i % 3) * 30
-            if -100 <= cloud_x <= SCREEN_WIDTH + 100:
-                pygame.draw.circle(self.screen, WHITE, (int(cloud_x), cloud_y), 30)
-                pygame.draw.circle(self.screen, WHITE, (int(cloud_x - 20), cloud_y), 20)
-                pygame.draw.circle(self.screen, WHITE, (int(cloud_x + 20), cloud_y), 20)
-        
-        hill_points = []
-        start_x = int(self.car.camera_x * 0.5) - 100
-        for x in range(start_x, start_x + SCREEN_WIDTH + 200, 50):
-            screen_x = x - self.car.camera_x * 0.5
-            if -100 <= screen_x <= SCREEN_WIDTH + 100:
-                hill_height = SCREEN_HEIGHT - 200 + int(50 * math.sin(x * 0.008))
-                hill_points.append((screen_x, hill_height))
-        
-        if len(hill_points) > 1:
-            hill_points.append((SCREEN_WIDTH + 100, SCREEN_HEIGHT))
-            hill_points.append((-100, SCREEN_HEIGHT))
-            pygame.draw.polygon(self.screen, (34, 139, 34), hill_points)
-        
-        road_y = SCREEN_HEIGHT - 150
-        pygame.draw.rect(self.screen, (50, 50, 50), (0, road_y, SCREEN_WIDTH, 150)) 
-        pygame.draw.rect(self.screen, GREEN, (0, road_y - 20, SCREEN_WIDTH, 20))  
-        
-        marking_start = int(self.car.camera_x) % 100
-        for x in range(-marking_start, SCREEN_WIDTH + 100, 100):
-            pygame.draw.rect(self.screen, YELLOW, (x, road_y + 70, 50, 5))
-        
-        tree_start = int(self.car.camera_x * 0.8)
-        for i in range(15):
-            tree_world_x = 80 + i * 120 + tree_start
-            tree_x = tree_world_x - self.car.camera_x * 0.8
-            if -50 <= tree_x <= SCREEN_WIDTH + 50:
-                tree_y = SCREEN_HEIGHT - 180
-                pygame.draw.rect(self.screen, BROWN, (int(tree_x - 5), tree_y, 10, 30))
-                pygame.draw.circle(self.screen, (0, 100, 0), (int(tree_x), tree_y), 15)
+        self.hill_background.draw(self.screen, self.car.camera_x)
+        self.terrain.draw(self.screen, self.car.camera_x)
         
         if self.lives > 0:
             self.car.draw(self.screen, self.car.camera_x)
@@ -1228,37 +4054,29 @@ class Game:
             obs.draw(self.screen, self.car.camera_x)
         for b in self.bullets:
             b.draw(self.screen, self.car.camera_x)
-        for m in self.muzzles[:]:
-            m.update()
+        for m in self.muzzles:
             m.draw(self.screen, self.car.camera_x)
-            if m.timer > m.lifetime:
-                self.muzzles.remove(m)
-        for e in self.explosions[:]:
-            e.update()
+        for e in self.explosions:
             e.draw(self.screen, self.car.camera_x)
-            if e.timer > e.max_time:
-                self.explosions.remove(e)
         if self.golden_coin:
-            self.golden_coin.update()
             self.golden_coin.draw(self.screen, self.car.camera_x)
             
         if hasattr(self.car, 'vel_x') and self.car.vel_x > 2:
             for i in range(4):
                 smoke_x = self.car.x - self.car.camera_x - 20 - i * 8
-                smoke_y = self.car.y + 20 + random.randint(-3, 3)
+                smoke_y = self.car.y + 20 + self.fx_rng.randint(-3, 3)
                 if -30 <= smoke_x <= SCREEN_WIDTH + 30:
                     pygame.draw.circle(self.screen, (100, 100, 100), (int(smoke_x), int(smoke_y)), 4 - i)
             
-        ui_font = pygame.font.Font(None, 32)
-        score_text = ui_font.render(f"Score: {self.score}", True, BLACK)
-        lives_text = ui_font.render(f"Lives: {self.lives}", True, BLACK)
-        fuel_text = ui_font.render(f"Fuel: {int(self.car.fuel)}", True, BLACK)
-        distance_text = ui_font.render(f"Distance: {int(self.car.distance)}m", True, BLACK)
-        speed_text = ui_font.render(f"Speed: {abs(int(self.car.vel_x * 15))} km/h", True, BLACK)
+        score_text = self.hud['hc_score'].surface(self.score)
+        lives_text = self.hud['hc_lives'].surface(self.lives)
+        fuel_text = self.hud['hc_fuel'].surface(int(self.car.fuel))
+        distance_text = self.hud['hc_distance'].surface(int(self.car.distance))
+        speed_text = self.hud['hc_speed'].surface(abs(int(self.car.vel_x * 15)))
         
-        Total_text = ui_font.render(f"Score: {self.Total_score}", True, BLACK)
+        Total_text = self.hud['hc_total'].surface(self.Total_score)
         self.screen.blit(Total_text, (10, 10))
-        high_text = ui_font.render(f"Top: {self.high_score}", True, BLACK)
+        high_text = self.hud['hc_high'].surface(self.high_score)
         high_x = SCREEN_WIDTH // 2 - high_text.get_width() // 2
         self.screen.blit(high_text, (high_x, 10))
         self.screen.blit(score_text, (10, 45))
@@ -1270,14 +4088,7 @@ class Game:
 
         if self.red_coin:
 
-            draw_x = int(self.red_coin.x - self.car.camera_x)
-            draw_y = int(self.red_coin.y)
-
-            self.red_coin.update()
-            glow_size = 12 + int(3 * math.sin(self.red_coin.glow_timer * 0.2))
-            pygame.draw.circle(self.screen, RED, (draw_x + 12, draw_y + 12), glow_size)
-            pygame.draw.circle(self.screen, DARK_RED, (draw_x + 12, draw_y + 12), glow_size, 3)
-            pygame.draw.circle(self.screen, WHITE, (draw_x + 12, draw_y + 12), 4)
+            self.red_coin.draw(self.screen, self.car.camera_x)
         
 
         fuel_bar_width = 200
@@ -1288,37 +4099,193 @@ class Game:
         pygame.draw.rect(self.screen, fuel_color, (SCREEN_WIDTH - fuel_bar_width - 20, 20, fuel_bar_width * fuel_ratio, 20))
         pygame.draw.rect(self.screen, BLACK, (SCREEN_WIDTH - fuel_bar_width - 20, 20, fuel_bar_width, 20), 2)
         
-        fuel_label = ui_font.render("FUEL", True, BLACK)
+        fuel_label = TEXT_CACHE.render(self.ui_font, "FUEL", BLACK)
         self.screen.blit(fuel_label, (SCREEN_WIDTH - fuel_bar_width - 20, 50))
         
 
         if self.lives <= 0:
-            game_over_text = self.font.render("GAME OVER! Press R to restart", True, RED)
+            game_over_text = TEXT_CACHE.render(self.font, "GAME OVER! Press R to restart", RED)
             text_rect = game_over_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
             self.screen.blit(game_over_text, text_rect)
             
 
         if self.lives > 0:
-            instruction_text = self.font.render("RIGHT/D = Accelerate, LEFT/A = Brake/Reverse, P = Back to Platformer", True, BLACK)
+            instruction_text = TEXT_CACHE.render(self.font, "RIGHT/D = Accelerate, LEFT/A = Brake/Reverse, P = Back to Platformer", BLACK)
             self.screen.blit(instruction_text, (10, SCREEN_HEIGHT - 30))
-        
 
-        pygame.display.flip()
-        
+        for surf, rect in self.profiler.overlay_items():
+            self.screen.blit(surf, rect)
+
+    def state_hash(self):
+        """SHA-256 over the simulation state (not rendering or the high-score file)"""
+        self.sync_entities()
+        p = self.player
+        c = self.car
+        state = (
+            self.game_mode, self.score, self.Total_score, self.lives, self.chaos_timer,
+            self.obstacle_timer, self.bullet_cooldown,
+            (p.x, p.y, p.vel_x, p.vel_y, p.on_ground, p.speed_boost_timer,
+             p.invulnerable_timer, p.reverse_controls, p.big_jump_timer),
+            (c.x, c.y, c.vel_x, c.vel_y, c.fuel, c.distance, c.camera_x),
+            [(pl.x, pl.rect.y, getattr(pl, 'visible', True), getattr(pl, 'touch_timer', 0))
+             for pl in self.platforms],
+            [(e.x, e.y, e.direction) for e in self.enemies],
+            [(co.x, co.y) for co in self.coins],
+            [(pu.x, pu.y, pu.type) for pu in self.powerups],
+            [(o.x, o.y, o.speed) for o in self.obstacles],
+            [(b.x, b.y) for b in self.bullets],
+            (self.red_coin.x, self.red_coin.y) if self.red_coin else None,
+            (self.golden_coin.x, self.golden_coin.y) if self.golden_coin else None,
+            self.rng.getstate(),
+        )
+        return hashlib.sha256(repr(state).encode()).digest()
+
+    def pixels(self):
+        """Zero-copy (width, height, 3) view of the screen; drop it before the next draw"""
+        return FrameCapture.view(self.screen)
+
+    def pool_stats(self):
+        """High-water marks and churn for the hill-climb entity pools"""
+        return {name: pool.stats() for name, pool in (
+            ('obstacles', self.obstacles), ('bullets', self.bullets),
+            ('muzzles', self.muzzles), ('explosions', self.explosions))}
+
+    def interpolated_entities(self):
+        if self.game_mode == "hill_climb":
+            return [self.car, *self.obstacles, *self.bullets]
+        return [self.player, *self.enemies, *(p for p in self.platforms if isinstance(p, MovingPlatform))]
+
+    def sim_step(self):
+        """One fixed FIXED_DT simulation step of the top scene"""
+        CHANNELS.begin_frame()
+        self.scenes.top().sim_step()
+        self.frame_count += 1
+
+    def play_step(self):
+        """Platformer/hill-climb step: input, then update"""
+        if self.interpolate:
+            if self.entity_storage == 'arrays' and self.game_mode == 'platformer':
+                capture_positions([self.player], self.frame_count)
+                self.platform_grid.capture(self.frame_count)
+                self.enemy_grid.capture(self.frame_count)
+            else:
+                capture_positions(self.interpolated_entities(), self.frame_count)
+            self.prev_camera_x = self.car.camera_x
+            self.prev_level_camera_x = self.camera_x
+        profiler = self.profiler
+        t = profiler.start()
+        self.handle_events()
+        profiler.stop('handle_events', t)
+        if self.scenes.top() is not self.scenes.base():
+            # Paused by this step's input: the paused game doesn't tick.
+            return
+        t = profiler.start()
+        self.update()
+        profiler.stop('update', t)
+
+    def step(self):
+        """Advance one frame: events, simulation and (every Nth frame) rendering"""
+        self.sim_step()
+        if self.render_every and self.frame_count % self.render_every == 0:
+            self.draw()
+        self.profiler.end_frame()
+
+    def idle_step(self):
+        """run() while an idle scene is on top: present it if stale, then sleep until input"""
+        self.draw()
+        wait = getattr(self.input, 'wait', None)
+        if wait is not None:
+            wait(IDLE_WAIT_MS)
+        else:
+            self.clock.tick(1000 // IDLE_WAIT_MS)
+        self.sim_step()
+        if not self.scenes.top().idle:
+            # Resume from now rather than catching up on the time spent waiting.
+            self.sim_clock.reset()
+
+    def simulate(self, frames):
+        """Step as fast as the CPU allows (no clock.tick); returns frames run"""
+        done = 0
+        while done < frames and self.running:
+            self.step()
+            done += 1
+        return done
+
     def run(self):
         print("🎮 Starting Devil Mario Game!")
+        if self.headless:
+            while self.running:
+                self.step()
+        self.sim_clock.reset()
         while self.running:
-            self.handle_events()
-            self.update()
-            self.draw()
-
-            if self.game_mode == "platformer":
-                pygame.display.flip()
-            self.clock.tick(FPS)
+            if self.scenes.top().idle:
+                self.idle_step()
+                continue
+            for _ in range(self.sim_clock.advance()):
+                self.sim_step()
+                if not self.running:
+                    break
+            self.draw(self.sim_clock.alpha if self.interpolate else 1.0)
+            self.profiler.end_frame()
+            self.clock.tick(self.render_fps)
         
+        finish = getattr(self.input, 'finish', None)
+        if finish is not None:
+            finish(self)
+        if self.profile_path and self.profiler.frames:
+            self.profiler.export(self.profile_path)
+        self.high_score_store.close()
         pygame.quit()
         sys.exit()
 
+STARTUP.mark('import_game')
+
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    profile_path = sys.argv[sys.argv.index('--profile') + 1] if '--profile' in sys.argv else None
+    level_path = sys.argv[sys.argv.index('--level') + 1] if '--level' in sys.argv else None
+    entity_storage = 'arrays' if '--entity-arrays' in sys.argv else 'objects'
+    if '--replay' in sys.argv:
+        path = sys.argv[sys.argv.index('--replay') + 1]
+        ok, frames, elapsed = replay_session(path)
+        print(f'[replay] {frames} frames in {elapsed:.2f}s ({frames / max(elapsed, 1e-9):.0f} ticks/s), '
+              f'final state hash {"OK" if ok else "MISMATCH"}')
+        pygame.quit()
+        sys.exit(0 if ok else 1)
+    elif HEADLESS and '--frames' in sys.argv:
+        frames = int(sys.argv[sys.argv.index('--frames') + 1])
+        render_every = int(sys.argv[sys.argv.index('--render-every') + 1]) if '--render-every' in sys.argv else 0
+        # Soak runs are bots: they never touch the player's highscore.txt.
+        game = Game(headless=True, render_every=render_every, level=level_path, highscore_path=None,
+                    entity_storage=entity_storage)
+        game.profiler.enabled = profile_path is not None
+        game.report_startup = '--startup' in sys.argv
+        start = time.perf_counter()
+        done = game.simulate(frames)
+        elapsed = time.perf_counter() - start
+        print(f'[headless] {done} frames in {elapsed:.2f}s ({done / max(elapsed, 1e-9):.0f} ticks/s), '
+              f'mode={game.game_mode} score={game.Total_score}')
+        print(f'[headless] text cache: {TEXT_CACHE.stats()}')
+        print(f'[headless] sounds: {SOUNDS.stats()}')
+        print(f'[headless] mixer: {CHANNELS.stats()}')
+        print(f'[headless] pools: {game.pool_stats()}')
+        game.high_score_store.close()
+        print(f'[headless] high score: {game.high_score} {game.high_score_store.stats()}')
+        if profile_path:
+            for phase, s in game.profiler.summary(recent=False).items():
+                print(f"[profiler] {phase:<18} p50={s['p50_ms']:.3f} p95={s['p95_ms']:.3f} "
+                      f"p99={s['p99_ms']:.3f} max={s['max_ms']:.3f} ms")
+            game.profiler.export(profile_path)
+        pygame.quit()
+    elif '--record' in sys.argv:
+        recorder = InputRecorder(KeyboardInput(), sys.argv[sys.argv.index('--record') + 1])
+        game = Game(input_source=recorder, level=level_path, entity_storage=entity_storage)
+        game.profiler.enabled = profile_path is not None
+        game.profile_path = profile_path
+        game.report_startup = '--startup' in sys.argv
+        game.run()
+    else:
+        game = Game(level=level_path, entity_storage=entity_storage)
+        game.profiler.enabled = profile_path is not None
+        game.profile_path = profile_path
+        game.report_startup = '--startup' in sys.argv
+        game.run()
\ No newline at end of file
@@ -0,0 +1,127 @@
+import random
+
+import numpy as np
+import pygame
+import pytest
+
+import game
+from game import (SCREEN_HEIGHT, SCREEN_WIDTH, DisappearingPlatform, KeyState, MovingPlatform, Platform, Player,
+                  PlayerBatch)
+
+WIDTH = SCREEN_WIDTH * 2
+STATE = ('x', 'y', 'vel_x', 'vel_y', 'on_ground') + PlayerBatch.TIMERS
+FLOOR = SCREEN_HEIGHT - 100 - 50
+
+
+@pytest.fixture(autouse=True)
+def silent(monkeypatch):
+    monkeypatch.setattr(game, 'play_sound', lambda cue: None)
+
+
+def build_level(rng):
+    """Static, moving and disappearing platforms plus a zero-size one, in collision order"""
+    def y():
+        return rng.randint(150, SCREEN_HEIGHT - 130)
+    platforms = [Platform(rng.randint(0, WIDTH - 200), y(), rng.randint(60, 200), 20) for _ in range(12)]
+    for _ in range(6):
+        left = rng.randint(0, WIDTH - 250)
+        platforms.append(MovingPlatform(left + 10, y(), 120, 20, left, left + 200, rng.choice((1, 2, 1.5))))
+    platforms += [DisappearingPlatform(rng.randint(0, WIDTH - 120), y(), 120, 20) for _ in range(6)]
+    platforms.append(Platform(WIDTH // 2, SCREEN_HEIGHT - 300, 0, 20))
+    return platforms
+
+
+def spawn(rng, n):
+    return [Player(rng.randint(0, WIDTH - 40), rng.randint(0, SCREEN_HEIGHT - 150)) for _ in range(n)]
+
+
+class Driver:
+    """Same held keys and power-up refills for the scalar players and the batch"""
+    def __init__(self, players, batch, seed):
+        self.players = players
+        self.batch = batch
+        self.rng = np.random.default_rng(seed)
+        self.keys = None
+
+    def step(self, step, platforms_of):
+        rng, players, batch = self.rng, self.players, self.batch
+        n = len(players)
+        if step % 8 == 0:
+            self.keys = rng.random((3, n)) < np.array([0.3, 0.6, 0.25])[:, None]
+        if step % 50 == 0:
+            for name in PlayerBatch.TIMERS:
+                refill = (rng.random(n) < 0.2) * rng.integers(1, 300, n)
+                for i in np.flatnonzero(refill).tolist():
+                    setattr(players[i], name, int(refill[i]))
+                    getattr(batch, name)[i] = refill[i]
+        left, right, jump = self.keys
+        for i, player in enumerate(players):
+            held = [key for key, down in ((pygame.K_LEFT, left[i]), (pygame.K_RIGHT, right[i]),
+                                          (pygame.K_SPACE, jump[i])) if down]
+            player.update(platforms_of(i), KeyState(held), WIDTH)
+        batch.step(left, right, jump)
+        for name in STATE:
+            scalar = np.array([getattr(p, name) for p in players])
+            column = getattr(batch, name)
+            bad = np.flatnonzero(scalar != column)
+            assert not len(bad), (f'step {step} player {bad[0]} {name}: '
+                                  f'Player {scalar[bad[0]]} batch {column[bad[0]]}')
+
+
+def test_static_level_matches_player():
+    rng = random.Random(1)
+    platforms = build_level(rng)
+    for platform in platforms[-4:-1]:
+        platform.visible = False
+    players = spawn(rng, 64)
+    batch = PlayerBatch.from_players(players, platforms, WIDTH)
+    driver = Driver(players, batch, 1)
+    landings = bumps = 0
+    for step in range(600):
+        rising = [p.vel_y < 0 for p in players]
+        driver.step(step, lambda i: platforms)
+        landings += sum(p.on_ground and p.y < FLOOR for p in players)
+        bumps += sum(r and p.vel_y == 0 for r, p in zip(rising, players))
+    assert landings and bumps
+
+
+def test_moving_and_disappearing_platforms_match_player():
+    rng = random.Random(2)
+    platforms = build_level(rng)
+    moving = [p for p in platforms if isinstance(p, MovingPlatform)]
+    disappearing = [p for p in platforms if isinstance(p, DisappearingPlatform)]
+    start_x = [p.x for p in moving]
+    players = spawn(rng, 64)
+    batch = PlayerBatch.from_players(players, platforms, WIDTH)
+    driver = Driver(players, batch, 2)
+    hidden_steps = 0
+    for step in range(600):
+        for platform in platforms:
+            platform.update()
+        if step % 40 == 0:
+            rng.choice(disappearing).trigger_disappear()
+        batch.set_platforms(platforms)
+        driver.step(step, lambda i: platforms)
+        hidden_steps += sum(not p.visible for p in disappearing)
+    assert hidden_steps and [p.x for p in moving] != start_x
+
+
+def test_per_player_visibility_matches_player():
+    rng = random.Random(3)
+    shared = build_level(rng)
+    n = 48
+    # Every player gets its own copies of the disappearing platforms.
+    worlds = [[DisappearingPlatform(*p.rect) if isinstance(p, DisappearingPlatform) else p for p in shared]
+              for _ in range(n)]
+    players = spawn(rng, n)
+    batch = PlayerBatch.from_players(players, shared, WIDTH)
+    driver = Driver(players, batch, 3)
+    for step in range(600):
+        if step % 30 == 0:
+            for world in worlds:
+                for platform in world:
+                    if isinstance(platform, DisappearingPlatform) and rng.random() < 0.3:
+                        platform.visible = not platform.visible
+        batch.visible = np.array([[getattr(p, 'visible', True) for p in world] for world in worlds])
+        driver.step(step, worlds.__getitem__)
+    assert not batch.visible.all()